@@ -1,43 +1,52 @@
 import customtkinter as ctk
 from tkinter import messagebox
-import json
 import os
 from datetime import datetime
 from PIL import Image
-import webbrowser
-from urllib.parse import quote
-from utils.pdf_generator import generate_pdf
+from collections import deque
+from utils.bill_archive import BILL_STORAGE, get_bill_archive
+from utils.cart import Cart
+from utils.outbox import Outbox
+from utils.pdf_worker import PdfWorkerPool
 
-PRODUCTS_FILE = "data/products.json"  # Changed to match your Product page
-
-def load_products():
-    """Load product data from JSON file."""
-    if os.path.exists(PRODUCTS_FILE):
-        try:
-            with open(PRODUCTS_FILE, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            messagebox.showerror("Error", "products.json contains invalid JSON.")
-    return []
+SUGGESTION_LIMIT = 15  # product names shown in the type-ahead dropdown
+TYPEAHEAD_DELAY_MS = 120
 
 class BillingPage(ctk.CTkFrame):
-    def __init__(self, master, *args, **kwargs):
+    def __init__(self, master, repository, ledger=None, outbox=None, *args, **kwargs):
         super().__init__(master, *args, **kwargs)
         self.configure(fg_color="#f4f6f8")
 
-        self.products = load_products()
+        self.repository = repository
+        self.ledger = ledger
+        self.outbox = outbox or Outbox()
+        self.typeahead_job = None
+        self.scan_queue = deque()  # codes read by the barcode scanner, not yet on the bill
+        self.scan_job = None
 
         self.customer_name_var = ctk.StringVar()
         self.customer_contact_var = ctk.StringVar()
         self.product_var = ctk.StringVar()
+        self.scan_var = ctk.StringVar()
         self.quantity_var = ctk.StringVar(value="1")
         self.gst_var = ctk.StringVar(value="18")
         self.discount_var = ctk.StringVar(value="5")
 
-        self.bill_items = []
+        self.cart = Cart()
+        self.bill_recorded = False  # True once the sale is queued in the ledger
+        self.bill_committed = False  # True once the ledger has saved it
+        self.after_commit = []  # invoice work waiting for the ledger to save this bill
+        self.bill_terms = None  # (name, contact, gst, discount) the bill was finalized with
         self.pdf_path = None
+        self.bill_record_id = None  # stored bill record, when BILL_STORAGE is "record"
+        self.bill_serial = 0  # bumped on Clear so late PDFs don't attach to the next bill
+        self.pdf_pool = PdfWorkerPool(self)
 
         self.create_widgets()
+        self.render_bill_display()
+        self.gst_var.trace_add("write", self.update_totals_display)
+        self.discount_var.trace_add("write", self.update_totals_display)
+        self.repository.subscribe(self.on_products_changed)
 
     def create_widgets(self):
         wrapper = ctk.CTkFrame(self, fg_color="#F3F4F6")
@@ -91,10 +100,11 @@ class BillingPage(ctk.CTkFrame):
 
         ctk.CTkLabel(form_frame, text="Product:", font=("Segoe UI", 12, "bold"), text_color="#374151")\
             .grid(row=4, column=0, padx=20, sticky="w")
-        product_names = [prod.get("name", "Unnamed") for prod in self.products] or ["No Products Available"]
+        product_names = self.repository.suggest("", SUGGESTION_LIMIT) or ["No Products Available"]
         self.product_dropdown = ctk.CTkComboBox(form_frame, values=product_names, variable=self.product_var, **entry_style)
         self.product_dropdown.grid(row=5, column=0, padx=20, pady=6, sticky="ew")
         self.product_dropdown.set(product_names[0])
+        self.product_dropdown.bind("<KeyRelease>", self.on_product_typed)
 
         ctk.CTkLabel(form_frame, text="Quantity:", font=("Segoe UI", 12, "bold"), text_color="#374151")\
             .grid(row=4, column=1, padx=20, sticky="w")
@@ -141,124 +151,359 @@ class BillingPage(ctk.CTkFrame):
         ctk.CTkButton(form_frame, text="🔄 Refresh Products", fg_color="#fca5a5", hover_color="#fecaca",
                       command=self.refresh_products, **button_style).grid(row=11, column=1, pady=5, padx=10, sticky="ew")
 
+        ctk.CTkButton(form_frame, text="✏️ Update Qty", fg_color="#38bdf8", hover_color="#7dd3fc",
+                      command=self.update_quantity, **button_style).grid(row=12, column=0, pady=5, padx=10, sticky="ew")
+        ctk.CTkButton(form_frame, text="➖ Remove Item", fg_color="#f87171", hover_color="#fca5a5",
+                      command=self.remove_from_bill, **button_style).grid(row=12, column=1, pady=5, padx=10, sticky="ew")
+
         # Bill Display
         bill_frame = ctk.CTkFrame(form_frame, fg_color="#FFFFFF", corner_radius=8)
-        bill_frame.grid(row=12, column=0, columnspan=2, pady=20, padx=20, sticky="nsew")
+        bill_frame.grid(row=13, column=0, columnspan=2, pady=20, padx=20, sticky="nsew")
+
+        # Barcode scanner input: keyboard-wedge scanners type the code followed by Enter
+        scan_frame = ctk.CTkFrame(bill_frame, fg_color="transparent")
+        scan_frame.pack(fill="x", padx=5, pady=(5, 0))
+        ctk.CTkLabel(scan_frame, text="🔎 Scan SKU:", font=("Segoe UI", 12, "bold"), text_color="#374151")\
+            .pack(side="left")
+        self.scan_entry = ctk.CTkEntry(scan_frame, textvariable=self.scan_var, placeholder_text="Scan or type SKU and press Enter", **entry_style)
+        self.scan_entry.pack(side="left", fill="x", expand=True, padx=8)
+        self.scan_entry.bind("<Return>", self.on_scan)
+        self.scan_status_label = ctk.CTkLabel(scan_frame, text="", font=("Segoe UI", 12), text_color="#374151")
+        self.scan_status_label.pack(side="left")
+
+        self.pdf_status_label = ctk.CTkLabel(bill_frame, text="", font=("Segoe UI", 12), text_color="#374151")
+        self.pdf_status_label.pack(anchor="w", padx=5)
 
         self.bill_display = ctk.CTkTextbox(bill_frame, font=("Courier New", 12), fg_color="white", border_width=1)
         self.bill_display.pack(fill="both", expand=True, padx=5, pady=5)
 
         # Configure grid expansion
         form_frame.grid_columnconfigure((0, 1), weight=1)
-        form_frame.grid_rowconfigure(12, weight=1)
+        form_frame.grid_rowconfigure(13, weight=1)
 
     # ------------------ BILL LOGIC ------------------
 
-    def add_to_bill(self):
+    def read_rates(self):
+        """ GST and discount percentages; raises ValueError on bad input. Once the bill
+        is finalized these are the rates it was recorded with, not the form's """
+        if self.bill_terms:
+            return self.bill_terms[2:]
+        return float(self.gst_var.get() or 0), float(self.discount_var.get() or 0)
+
+    def read_bill_terms(self):
+        """ (name, contact, gst, discount) for an invoice, or None after telling the user what's missing """
+        if self.bill_terms:
+            return self.bill_terms  # every invoice of a finalized bill matches its ledger row
+        name = self.customer_name_var.get()
+        contact = self.customer_contact_var.get()
+        if not name:
+            messagebox.showwarning("Info Missing", "Enter customer name.")
+            return None
+        if not self.cart:
+            messagebox.showinfo("Empty", "No items in bill.")
+            return None
+        try:
+            gst_percent, discount_percent = self.read_rates()
+        except ValueError:
+            messagebox.showerror("Error", "GST and Discount must be numbers.")
+            return None
+        return name, contact, gst_percent, discount_percent
+
+    def selected_product(self):
         product_name = self.product_var.get()
+        if not product_name or product_name == "No Products Available":
+            messagebox.showwarning("Warning", "Please select a product.")
+            return None
+        if self.bill_recorded:
+            messagebox.showwarning("Warning", "This bill is already finalized. Clear it to start a new bill.")
+            return None
+        product = self.repository.find_by_name(product_name)
+        if not product:
+            messagebox.showwarning("Warning", f"Product not found: {product_name}")
+        return product
+
+    def read_quantity(self, allow_zero=False):
         try:
             quantity = int(self.quantity_var.get())
-            if quantity <= 0:
+            if quantity < 0 or (quantity == 0 and not allow_zero):
                 raise ValueError
         except ValueError:
             messagebox.showwarning("Warning", "Please enter a valid quantity.")
+            return None
+        return quantity
+
+    def add_to_bill(self):
+        quantity = self.read_quantity()
+        if quantity is None:
             return
-        if not product_name or product_name == "No Products Available":
-            messagebox.showwarning("Warning", "Please select a product.")
+        product = self.selected_product()
+        if not product:
             return
-        product = next((p for p in self.products if p.get("name") == product_name), None)
-        if product:
-            try:
-                price = float(product.get("price", 0))
-                total_price = round(price * quantity, 2)
-                self.bill_items.append((product_name, quantity, price, total_price))
-                self.update_bill_display()
-            except (ValueError, TypeError):
-                messagebox.showerror("Error", f"Invalid price for product: {product_name}")
-
-    def update_bill_display(self):
+        line, is_new = self.cart.add(product.id, product.name, product.price, quantity)
+        if is_new:
+            self.insert_bill_line(line)
+        else:
+            self.patch_bill_line(line)
+        self.update_totals_display()
+
+    def update_quantity(self):
+        """ Set the quantity of the selected product's line; 0 removes the line """
+        quantity = self.read_quantity(allow_zero=True)
+        if quantity is None:
+            return
+        product = self.selected_product()
+        if not product:
+            return
+        if product.id not in self.cart:
+            messagebox.showwarning("Warning", f"{product.name} is not on the bill.")
+            return
+        if quantity == 0:
+            self.remove_bill_line(self.cart.remove(product.id))
+        else:
+            self.patch_bill_line(self.cart.set_quantity(product.id, quantity))
+        self.update_totals_display()
+
+    def remove_from_bill(self):
+        product = self.selected_product()
+        if not product:
+            return
+        if product.id not in self.cart:
+            messagebox.showwarning("Warning", f"{product.name} is not on the bill.")
+            return
+        self.remove_bill_line(self.cart.remove(product.id))
+        self.update_totals_display()
+
+    # ------------------ BARCODE SCANNING ------------------
+
+    def on_scan(self, event):
+        # Only queue the code here; a burst of scans is applied in one pass once Tk is idle
+        code = self.scan_var.get().strip()
+        self.scan_var.set("")
+        if code:
+            self.scan_queue.append(code)
+            if self.scan_job is None:
+                self.scan_job = self.after_idle(self.apply_scans)
+        return "break"
+
+    def apply_scans(self):
+        self.scan_job = None
+        if self.bill_recorded:
+            self.scan_queue.clear()
+            self.bell()
+            self.scan_status_label.configure(text="Bill finalized. Clear it to start a new bill.", text_color="#dc2626")
+            return
+
+        scanned = {}  # product id -> [product, quantity], in scan order
+        unknown = []
+        while self.scan_queue:
+            code = self.scan_queue.popleft()
+            product = self.repository.find_by_sku(code)
+            if product is None:
+                unknown.append(code)
+            elif product.id in scanned:
+                scanned[product.id][1] += 1
+            else:
+                scanned[product.id] = [product, 1]
+
+        for product, quantity in scanned.values():
+            line, is_new = self.cart.add(product.id, product.name, product.price, quantity)
+            if is_new:
+                self.insert_bill_line(line)
+            else:
+                self.patch_bill_line(line)
+        if scanned:
+            self.update_totals_display()
+
+        if unknown:
+            self.bell()
+            self.scan_status_label.configure(text=f"Unknown SKU: {', '.join(unknown)}", text_color="#dc2626")
+        elif scanned:
+            last = self.cart.get(list(scanned)[-1])
+            self.scan_status_label.configure(text=f"✔ {last.name} x{last.quantity}", text_color="#16a34a")
+
+    # ------------------ BILL DISPLAY ------------------
+    # Each cart line owns one row of the textbox, found through a text mark
+    # named after its product id; the "totals" mark starts the footer. Edits
+    # rewrite only the affected row and the footer, never the whole bill.
+
+    @staticmethod
+    def format_bill_line(line):
+        return f"{line.name:<20}{line.quantity:<10}{line.price:<10.2f}{line.total:.2f}\n"
+
+    def render_bill_display(self, heading=""):
         self.bill_display.delete("1.0", "end")
+        self.bill_display.insert("end", heading)
         self.bill_display.insert("end", f"{'Product':<20}{'Qty':<10}{'Price':<10}{'Total'}\n")
         self.bill_display.insert("end", "-" * 60 + "\n")
-        for item in self.bill_items:
-            name, qty, price, total = item
-            self.bill_display.insert("end", f"{name:<20}{qty:<10}{price:<10.2f}{total:.2f}\n")
+        self.bill_display.mark_set("totals", "end-1c")
+        self.bill_display.mark_gravity("totals", "left")
+        for line in self.cart:
+            self.insert_bill_line(line)
+        self.update_totals_display()
+
+    def insert_bill_line(self, line):
+        index = self.bill_display.index("totals")
+        self.bill_display.insert(index, self.format_bill_line(line))
+        mark = f"line{line.product_id}"
+        self.bill_display.mark_set(mark, index)
+        self.bill_display.mark_gravity(mark, "left")
+        self.bill_display.mark_set("totals", f"{index} +1 lines")
+        self.bill_display.see(index)
+
+    def patch_bill_line(self, line):
+        mark = f"line{line.product_id}"
+        # Insert the new text before deleting the old row so the marks keep their place
+        self.bill_display.insert(mark, self.format_bill_line(line))
+        self.bill_display.delete(f"{mark} +1 lines", f"{mark} +2 lines")
+        self.bill_display.see(mark)
+
+    def remove_bill_line(self, line):
+        mark = f"line{line.product_id}"
+        self.bill_display.delete(mark, f"{mark} +1 lines")
+        self.bill_display.mark_unset(mark)
+
+    def update_totals_display(self, *args):
+        try:
+            totals = self.cart.totals(*self.read_rates())
+        except ValueError:
+            return  # half-typed GST/discount; keep the last totals shown
+        self.bill_display.delete("totals", "end")
         self.bill_display.insert("end", "-" * 60 + "\n")
-
-        subtotal = sum(item[3] for item in self.bill_items)
-        gst_percent = float(self.gst_var.get() or 0)
-        discount_percent = float(self.discount_var.get() or 0)
-        gst_amount = subtotal * gst_percent / 100
-        discount_amount = subtotal * discount_percent / 100
-        final_amount = subtotal + gst_amount - discount_amount
-
-        self.bill_display.insert("end", f"{'Subtotal:':>45} ₹{subtotal:.2f}\n")
-        self.bill_display.insert("end", f"{'GST:':>45} ₹{gst_amount:.2f}\n")
-        self.bill_display.insert("end", f"{'Discount:':>45} -₹{discount_amount:.2f}\n")
-        self.bill_display.insert("end", f"{'Final Total:':>45} ₹{final_amount:.2f}")
+        self.bill_display.insert("end", f"{'Subtotal:':>45} ₹{totals.subtotal:.2f}\n")
+        self.bill_display.insert("end", f"{'Discount:':>45} -₹{totals.discount_amount:.2f}\n")
+        self.bill_display.insert("end", f"{'GST:':>45} ₹{totals.gst_amount:.2f}\n")
+        self.bill_display.insert("end", f"{'Final Total:':>45} ₹{totals.total:.2f}")
 
     def generate_bill(self):
-        name = self.customer_name_var.get()
-        contact = self.customer_contact_var.get()
-        if not name:
-            messagebox.showwarning("Info Missing", "Enter customer name.")
-            return
-        if not self.bill_items:
-            messagebox.showinfo("Empty", "No items in bill.")
+        terms = self.read_bill_terms()
+        if terms is None:
             return
+        name, contact, gst_percent, discount_percent = terms
 
         now = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-        subtotal = sum(item[3] for item in self.bill_items)
-        gst_percent = float(self.gst_var.get() or 0)
-        discount_percent = float(self.discount_var.get() or 0)
-        gst_amount = subtotal * gst_percent / 100
-        discount_amount = subtotal * discount_percent / 100
-        final_amount = subtotal + gst_amount - discount_amount
+        self.render_bill_display(f"Customer: {name}\nContact: {contact}\nDate: {now}\n\n")
+        kwargs = self.pdf_kwargs(name, contact, gst_percent, discount_percent)
+        total = self.cart.totals(gst_percent, discount_percent).total
+        bill_serial = self.bill_serial
 
-        self.bill_display.delete("1.0", "end")
-        self.bill_display.insert("end", f"Customer: {name}\nContact: {contact}\nDate: {now}\n\n")
-        self.bill_display.insert("end", f"{'Product':<20}{'Qty':<10}{'Price':<10}{'Total'}\n")
-        self.bill_display.insert("end", "-" * 60 + "\n")
-        for pname, qty, price, total in self.bill_items:
-            self.bill_display.insert("end", f"{pname:<20}{qty:<10}{price:<10.2f}{total:.2f}\n")
-        self.bill_display.insert("end", "-" * 60 + "\n")
-        self.bill_display.insert("end", f"{'Subtotal:':>45} ₹{subtotal:.2f}\n")
-        self.bill_display.insert("end", f"{'GST:':>45} ₹{gst_amount:.2f}\n")
-        self.bill_display.insert("end", f"{'Discount:':>45} -₹{discount_amount:.2f}\n")
-        self.bill_display.insert("end", f"{'Final Total:':>45} ₹{final_amount:.2f}")
-        messagebox.showinfo("Done", f"Bill generated for {name}.")
+        def on_committed():
+            if BILL_STORAGE == "record":
+                self.save_bill_record(kwargs, total, bill_serial)
+            messagebox.showinfo("Done", f"Bill generated for {name}.")
+
+        self.finalize_bill(name, contact, gst_percent, discount_percent, on_committed)
 
     def export_pdf(self):
-        if not self.bill_items:
-            messagebox.showwarning("Empty", "No items in the bill.")
-            return
-        name = self.customer_name_var.get()
-        contact = self.customer_contact_var.get()
-        if not name:
-            messagebox.showwarning("Missing", "Enter customer name.")
+        terms = self.read_bill_terms()
+        if terms is None:
             return
-        try:
-            gst = float(self.gst_var.get())
-            discount = float(self.discount_var.get())
-            pdf_path = generate_pdf(
-                customer_name=name,
-                customer_contact=contact,
-                bill_items=self.bill_items,
-                gst_percent=gst,
-                discount_percent=discount,
-                logo_path="assets/logo.png",
-                shop_name="My Shop"
-            )
-            if pdf_path and os.path.exists(pdf_path):
-                self.pdf_path = pdf_path
-                messagebox.showinfo("Saved", f"PDF saved to:\n{pdf_path}")
+        name, contact, gst, discount = terms
+
+        kwargs = self.pdf_kwargs(name, contact, gst, discount)
+        total = self.cart.totals(gst, discount).total
+        bill_serial = self.bill_serial
+        callback = lambda future: self.on_pdf_done(future, name, bill_serial)
+
+        def on_committed():
+            # Render in a worker process; the counter can start the next bill meanwhile
+            if BILL_STORAGE == "record":
+                self.pdf_pool.submit_record(self.save_bill_record(kwargs, total, bill_serial), callback)
             else:
+                self.pdf_pool.submit(callback=callback, **kwargs)
+            self.pdf_status_label.configure(text=f"🖨️ Rendering PDF for {name}... ({self.pdf_pool.pending} in queue)")
+
+        # No invoice is created unless the ledger accepts the sale
+        self.finalize_bill(name, contact, gst, discount, on_committed)
+
+    def on_pdf_done(self, future, name, bill_serial):
+        try:
+            pdf_path = future.result()
+            if not pdf_path or not os.path.exists(pdf_path):
                 raise Exception("PDF not created.")
         except Exception as e:
-            messagebox.showerror("Error", f"PDF generation failed:\n{str(e)}")
+            self.pdf_status_label.configure(text="")
+            messagebox.showerror("Error", f"PDF generation failed for {name}:\n{str(e)}")
+            return
+        if bill_serial == self.bill_serial:
+            self.pdf_path = pdf_path
+        pending = self.pdf_pool.pending
+        status = f"💾 PDF saved: {pdf_path}"
+        if pending:
+            status += f" ({pending} still rendering)"
+        self.pdf_status_label.configure(text=status)
+
+    def pdf_kwargs(self, name, contact, gst_percent, discount_percent):
+        return {
+            "customer_name": name,
+            "customer_contact": contact,
+            "bill_items": self.cart.items(),
+            "gst_percent": gst_percent,
+            "discount_percent": discount_percent,
+            "logo_path": "assets/logo.png",
+            "shop_name": "My Shop"
+        }
+
+    def save_bill_record(self, kwargs, total, bill_serial):
+        """ Store the bill as a compact record (once); PDFs are rendered from it on demand """
+        if bill_serial == self.bill_serial and self.bill_record_id is not None:
+            return self.bill_record_id
+        record_id = get_bill_archive().save_record(kwargs, total=total)
+        if bill_serial == self.bill_serial:
+            self.bill_record_id = record_id
+        return record_id
+
+    def finalize_bill(self, name, contact, gst_percent, discount_percent, on_committed):
+        """ Record the sale and its stock decrements in the ledger, once per bill,
+        and call on_committed() only after the ledger has saved it """
+        if self.ledger is None or self.bill_committed:
+            on_committed()
+            return
+        if self.bill_recorded:
+            self.after_commit.append(on_committed)  # already queued; wait for the same result
+            return
+        totals = self.cart.totals(gst_percent, discount_percent)
+        bill = {
+            "customer": name,
+            "contact": contact,
+            "gst_percent": gst_percent,
+            "discount_percent": discount_percent,
+            "subtotal": float(totals.subtotal),
+            "total": float(totals.total),
+            "lines": [
+                (line.product_id, line.name, line.quantity, float(line.price), float(line.total))
+                for line in self.cart
+            ]
+        }
+        bill_serial = self.bill_serial
+        waiting = self.after_commit = [on_committed]
+        self.bill_terms = (name, contact, gst_percent, discount_percent)
+        # Until the result is applied, the stock rows the ledger writes must not
+        # look like another till's changes (that would reload the whole catalog)
+        self.repository.writes_in_flight += 1
+        self.ledger.record_bill(bill, callback=lambda result: self.on_bill_recorded(result, bill_serial, waiting))
+        self.bill_recorded = True
+
+    def on_bill_recorded(self, result, bill_serial, waiting):
+        self.repository.writes_in_flight -= 1
+        current = bill_serial == self.bill_serial
+        if result.error:
+            if current:
+                self.bill_recorded = False  # let the cashier fix the bill and retry
+                self.after_commit = []
+                self.bill_terms = None
+            messagebox.showerror(
+                "Sale Not Recorded", f"The sale could not be saved, so no invoice was created:\n{result.error}"
+            )
+            return
+        self.repository.apply_stock_levels(result.stock)
+        if current:
+            self.bill_committed = True
+        for on_committed in waiting:
+            on_committed()
 
     def send_whatsapp(self):
-        if not self.pdf_path or not os.path.exists(self.pdf_path):
+        has_pdf = self.pdf_path and os.path.exists(self.pdf_path)
+        if not has_pdf and self.bill_record_id is None:
             messagebox.showwarning("Missing", "Generate PDF first.")
             return
         contact = self.customer_contact_var.get()
@@ -266,14 +511,13 @@ class BillingPage(ctk.CTkFrame):
             messagebox.showwarning("Missing", "Enter customer contact.")
             return
         try:
-            customer_name = self.customer_name_var.get()
-            gst = float(self.gst_var.get())
-            discount = float(self.discount_var.get())
-            total_amt = round(sum(item[3] for item in self.bill_items), 2)
+            customer_name = self.bill_terms[0] if self.bill_terms else self.customer_name_var.get()
+            gst, discount = self.read_rates()
+            total_amt = self.cart.totals(gst, discount).total
 
             product_lines = "\n".join([
-                f"• {name} x{qty} = ₹{total:.2f}"
-                for name, qty, price, total in self.bill_items
+                f"• {line.name} x{line.quantity} = ₹{line.total:.2f}"
+                for line in self.cart
             ])
 
             marketing_note = (
@@ -304,11 +548,43 @@ class BillingPage(ctk.CTkFrame):
                 f"{thanks_note}"
             )
 
-            url = f"https://web.whatsapp.com/send?phone=+91{contact}&text={quote(message)}"
-            webbrowser.open(url)
+            if has_pdf:
+                self.queue_whatsapp(contact, message, customer_name, self.pdf_path)
+                return
+            # Stored bill record without an invoice yet: render it first, then queue
+            bill_serial = self.bill_serial
+            self.pdf_pool.submit_record(
+                self.bill_record_id,
+                lambda future: self.on_share_pdf_done(future, contact, message, customer_name, bill_serial)
+            )
+            self.pdf_status_label.configure(text=f"🖨️ Rendering PDF for {customer_name}...")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to send WhatsApp message:\n{e}")
 
+    def on_share_pdf_done(self, future, contact, message, customer_name, bill_serial):
+        try:
+            pdf_path = future.result()
+            if not pdf_path or not os.path.exists(pdf_path):
+                raise Exception("PDF not created.")
+        except Exception as e:
+            self.pdf_status_label.configure(text="")
+            messagebox.showerror("Error", f"PDF generation failed for {customer_name}:\n{str(e)}")
+            return
+        if bill_serial == self.bill_serial:
+            self.pdf_path = pdf_path
+        self.queue_whatsapp(contact, message, customer_name, pdf_path)
+
+    def queue_whatsapp(self, contact, message, customer_name, pdf_path):
+        # The outbox sends in the background (rate limited, retried, deduplicated per bill)
+        if self.outbox.enqueue(contact, message, dedup_key=f"{pdf_path}|{contact}"):
+            status = f"📲 WhatsApp message for {customer_name} queued"
+        else:
+            status = f"📲 WhatsApp message for {customer_name} was already queued"
+        pending = self.outbox.stats().pending
+        if pending > 1:
+            status += f" ({pending} waiting to send)"
+        self.pdf_status_label.configure(text=status)
+
     def clear_bill(self):
         self.customer_name_var.set("")
         self.customer_contact_var.set("")
@@ -316,13 +592,35 @@ class BillingPage(ctk.CTkFrame):
         self.quantity_var.set("1")
         self.gst_var.set("18")
         self.discount_var.set("5")
-        self.bill_items.clear()
+        self.cart.clear()
+        self.bill_recorded = False
+        self.bill_committed = False
+        self.after_commit = []
+        self.bill_terms = None
         self.pdf_path = None
-        self.bill_display.delete("1.0", "end")
+        self.bill_record_id = None
+        self.bill_serial += 1
+        self.render_bill_display()
+        self.scan_status_label.configure(text="")
         self.refresh_products()
 
     def refresh_products(self):
-        self.products = load_products()
-        product_names = [prod.get("name", "Unnamed") for prod in self.products] or ["No Products Available"]
+        self.repository.refresh_if_changed()
+        product_names = self.repository.suggest("", SUGGESTION_LIMIT) or ["No Products Available"]
         self.product_dropdown.configure(values=product_names)
         self.product_dropdown.set(product_names[0])
+
+    def on_product_typed(self, event):
+        # Debounce so fast typing triggers one lookup, not one per key
+        if self.typeahead_job:
+            self.after_cancel(self.typeahead_job)
+        self.typeahead_job = self.after(TYPEAHEAD_DELAY_MS, self.update_suggestions)
+
+    def update_suggestions(self):
+        self.typeahead_job = None
+        product_names = self.repository.suggest(self.product_var.get(), SUGGESTION_LIMIT)
+        self.product_dropdown.configure(values=product_names or ["No Products Available"])
+
+    def on_products_changed(self, event, product):
+        # Keep what the cashier typed; only the list of suggestions changes
+        self.update_suggestions()
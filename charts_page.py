@@ -1,27 +1,20 @@
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import plotly.graph_objects as go
-import plotly.io as pio
 import io
-import json
-import os
-from collections import defaultdict
+from utils.aggregation import CategoryAggregator, price_stock_density, notable_products
+from utils.chart_cache import ChartCache
+from utils.chart_renderer import ChartRenderer, CHART_WIDTH, CHART_HEIGHT
 
-PRODUCTS_FILE = "data/products.json"
 LOGO_PATH = "assets/logo.png"  # Change to your logo path
-
-
-def load_products():
-    if os.path.exists(PRODUCTS_FILE):
-        with open(PRODUCTS_FILE, "r") as f:
-            return json.load(f)
-    return []
+SCATTER_MAX_POINTS = 2000  # above this, Price vs Stock is drawn as a density heatmap
+SCATTER_LABELS = 15  # product names shown on the Price vs Stock chart
 
 
 class ChartsPage(ctk.CTkFrame):
-    def __init__(self, master):
+    def __init__(self, master, repository):
         super().__init__(master)
-        self.products = load_products()
+        self.repository = repository
         self.configure(fg_color="#F3F4F6")  # Match HomeTab background
 
         # ---------- Logo ----------
@@ -64,17 +57,18 @@ class ChartsPage(ctk.CTkFrame):
         }
 
         buttons = [
-            ("📦 Stock by Category", self.show_bar_chart),
-            ("📈 Price Distribution", self.show_price_chart),
-            ("↔️ Product Count", self.show_count_chart),
-            ("📊 Price vs Stock", self.show_price_vs_stock),
-            ("🥧 Stock Share (Pie)", self.show_stock_pie_chart),
-            ("💰 Stock Value by Category", self.show_stock_value_chart)
+            ("📦 Stock by Category", "stock_by_category", self.stock_by_category_figure),
+            ("📈 Price Distribution", "price_distribution", self.price_distribution_figure),
+            ("↔️ Product Count", "product_count", self.product_count_figure),
+            ("📊 Price vs Stock", "price_vs_stock", self.price_vs_stock_figure),
+            ("🥧 Stock Share (Pie)", "stock_share", self.stock_share_figure),
+            ("💰 Stock Value by Category", "stock_value", self.stock_value_figure)
         ]
 
-        for i, (text, cmd) in enumerate(buttons):
+        for i, (text, chart, build_figure) in enumerate(buttons):
             row, col = divmod(i, 3)
-            ctk.CTkButton(btn_frame, text=text, command=cmd, **btn_style).grid(
+            command = lambda c=chart, b=build_figure: self.show_chart(c, b)
+            ctk.CTkButton(btn_frame, text=text, command=command, **btn_style).grid(
                 row=row, column=col, padx=15, pady=8
             )
 
@@ -89,18 +83,45 @@ class ChartsPage(ctk.CTkFrame):
         self.chart_frame.pack(padx=40, pady=30, fill="both", expand=True)
 
         self.chart_label = None
+        self.chart_serial = 0  # bumped per request so a slow render can't replace a newer chart
+        self.renderer = ChartRenderer(self)
+        self.chart_cache = ChartCache()
+        self.aggregator = CategoryAggregator(repository)
+
+    @property
+    def products(self):
+        return self.repository.all()
 
     # ---------------- Chart Functions ----------------
-    def show_bar_chart(self):
-        stock_by_cat = defaultdict(int)
-        for p in self.products:
-            try:
-                stock_by_cat[p.get("category", "Unknown")] += int(p.get("stock", 0))
-            except ValueError:
-                pass
+    # Each *_figure method builds one chart. Count, stock and value come from the
+    # repository's materialized totals; price quartiles from utils.aggregation
+
+    def category_totals(self):
+        """ (category, count, stock, value) per category from the materialized totals, sorted """
+        merged = {}
+        for category, totals in self.repository.aggregates.by_category.items():
+            name = category or "Unknown"
+            count, stock, value_paise = merged.get(name, (0, 0, 0))
+            merged[name] = (count + totals.count, stock + totals.stock, value_paise + totals.value_paise)
+        return [
+            (name, count, stock, value_paise / 100)
+            for name, (count, stock, value_paise) in sorted(merged.items())
+        ]
 
-        categories = sorted(stock_by_cat.keys())
-        stocks = [stock_by_cat[c] for c in categories]
+    def show_chart(self, chart, build_figure):
+        """ Show a chart from the cache, or build and render it if the data changed """
+        key = self.chart_cache.key(chart, self.repository.data_version, CHART_WIDTH, CHART_HEIGHT)
+        image = self.chart_cache.get(key)
+        if image is not None:
+            self.chart_serial += 1  # supersede any render still in flight
+            self.show_in_chart_frame(image=image)
+            return
+        self.render_chart(build_figure(), key)
+
+    def stock_by_category_figure(self):
+        rows = self.category_totals()
+        categories = [row[0] for row in rows]
+        stocks = [row[2] for row in rows]
 
         fig = go.Figure(go.Bar(
             x=categories, y=stocks,
@@ -115,19 +136,19 @@ class ChartsPage(ctk.CTkFrame):
             xaxis_title="Category",
             xaxis=dict(tickangle=-30, automargin=True)
         )
-        self.render_chart(fig)
-
-    def show_price_chart(self):
-        categories = sorted(set(p.get("category", "Unknown") for p in self.products))
-        data = []
-        for cat in categories:
-            prices = [
-                float(p.get("price", 0))
-                for p in self.products if p.get("category", "Unknown") == cat
-                and str(p.get("price", "0")).replace('.', '', 1).isdigit()
-            ]
-            if prices:
-                data.append(go.Box(y=prices, name=cat))
+        return fig
+
+    def price_distribution_figure(self):
+        # Boxes are drawn from precomputed quartiles; whiskers span min to max
+        agg = self.aggregator.get()
+        data = [
+            go.Box(
+                x=[cat], name=cat,
+                lowerfence=[row.price_min], q1=[row.price_q1], median=[row.price_median],
+                q3=[row.price_q3], upperfence=[row.price_max]
+            )
+            for cat, row in agg.iterrows()
+        ]
 
         fig = go.Figure(data=data)
         fig.update_layout(
@@ -137,15 +158,12 @@ class ChartsPage(ctk.CTkFrame):
             yaxis_title="Price (₹)",
             xaxis=dict(automargin=True)
         )
-        self.render_chart(fig)
-
-    def show_count_chart(self):
-        count_by_cat = defaultdict(int)
-        for p in self.products:
-            count_by_cat[p.get("category", "Unknown")] += 1
+        return fig
 
-        categories = sorted(count_by_cat.keys())
-        counts = [count_by_cat[c] for c in categories]
+    def product_count_figure(self):
+        rows = self.category_totals()
+        categories = [row[0] for row in rows]
+        counts = [row[1] for row in rows]
 
         fig = go.Figure(go.Bar(
             y=categories, x=counts,
@@ -161,44 +179,56 @@ class ChartsPage(ctk.CTkFrame):
             yaxis_title="Category",
             yaxis=dict(automargin=True)
         )
-        self.render_chart(fig)
-
-    def show_price_vs_stock(self):
-        prices, stocks, names = [], [], []
-        for p in self.products:
-            try:
-                prices.append(float(p.get("price", 0)))
-                stocks.append(int(p.get("stock", 0)))
-                names.append(p.get("name", ""))
-            except ValueError:
-                pass
-
-        fig = go.Figure(go.Scatter(
-            x=prices, y=stocks,
+        return fig
+
+    def price_vs_stock_figure(self):
+        products = self.products
+        labelled = notable_products(products, SCATTER_LABELS)
+
+        if len(products) > SCATTER_MAX_POINTS:
+            # One marker per product stops being readable (and fast to render)
+            # long before this; draw a fixed-size density grid instead
+            price_centers, stock_centers, counts = price_stock_density(products)
+            fig = go.Figure(go.Heatmap(
+                x=price_centers, y=stock_centers, z=counts,
+                colorscale='YlOrBr', colorbar=dict(title="Products"),
+                hovertemplate="Price ≈ ₹%{x}<br>Stock ≈ %{y}<br>%{z} products<extra></extra>"
+            ))
+            title = f"📊 Price vs Stock (density of {len(products)} products)"
+        else:
+            fig = go.Figure(go.Scatter(
+                x=[p.price for p in products], y=[p.stock for p in products],
+                mode='markers',
+                text=[p.name for p in products],
+                hovertemplate="%{text}<br>₹%{x}, stock %{y}<extra></extra>",
+                marker=dict(size=10, color='#F59E0B', opacity=0.8)
+            ))
+            title = "📊 Price vs Stock"
+
+        # Name only the notable products so labels stay legible at any catalog size
+        fig.add_trace(go.Scatter(
+            x=[p.price for p in labelled], y=[p.stock for p in labelled],
             mode='markers+text',
-            text=names,
+            text=[p.name for p in labelled],
             textposition='top center',
-            marker=dict(size=10, color='#F59E0B', opacity=0.8)
+            marker=dict(size=7, color='#B45309'),
+            hoverinfo='skip',
+            showlegend=False
         ))
         fig.update_layout(
-            title="📊 Price vs Stock",
+            title=title,
             template='plotly_white',
             height=400,
             xaxis_title="Price (₹)",
-            yaxis_title="Stock"
+            yaxis_title="Stock",
+            showlegend=False
         )
-        self.render_chart(fig)
+        return fig
 
-    def show_stock_pie_chart(self):
-        stock_by_cat = defaultdict(int)
-        for p in self.products:
-            try:
-                stock_by_cat[p.get("category", "Unknown")] += int(p.get("stock", 0))
-            except ValueError:
-                pass
-
-        labels = sorted(stock_by_cat.keys())
-        values = [stock_by_cat[l] for l in labels]
+    def stock_share_figure(self):
+        rows = self.category_totals()
+        labels = [row[0] for row in rows]
+        values = [row[2] for row in rows]
 
         fig = go.Figure(go.Pie(
             labels=labels,
@@ -212,20 +242,12 @@ class ChartsPage(ctk.CTkFrame):
             template='plotly_white',
             height=400
         )
-        self.render_chart(fig)
-
-    def show_stock_value_chart(self):
-        value_by_cat = defaultdict(float)
-        for p in self.products:
-            try:
-                price = float(p.get("price", 0))
-                stock = int(p.get("stock", 0))
-                value_by_cat[p.get("category", "Unknown")] += price * stock
-            except ValueError:
-                pass
+        return fig
 
-        categories = sorted(value_by_cat.keys())
-        values = [round(value_by_cat[c], 2) for c in categories]
+    def stock_value_figure(self):
+        rows = self.category_totals()
+        categories = [row[0] for row in rows]
+        values = [round(row[3], 2) for row in rows]
 
         fig = go.Figure(go.Bar(
             x=categories,
@@ -242,17 +264,40 @@ class ChartsPage(ctk.CTkFrame):
             xaxis_title="Category",
             xaxis=dict(tickangle=-30, automargin=True)
         )
-        self.render_chart(fig)
+        return fig
 
     # ---------------- Render Chart ----------------
-    def render_chart(self, fig):
-        img_bytes = pio.to_image(fig, format='png', width=900, height=400, scale=1)
-        img = Image.open(io.BytesIO(img_bytes))
-        img_tk = ImageTk.PhotoImage(img)
+    def render_chart(self, fig, cache_key=None):
+        # Rasterizing happens in the renderer process; show a placeholder until it's done
+        self.chart_serial += 1
+        chart_serial = self.chart_serial
+        self.show_in_chart_frame(text="⏳ Rendering chart...")
+        self.renderer.submit(
+            fig, lambda future: self.on_chart_rendered(future, chart_serial, cache_key),
+            width=CHART_WIDTH, height=CHART_HEIGHT
+        )
 
+    def on_chart_rendered(self, future, chart_serial, cache_key=None):
+        try:
+            img_bytes = future.result()
+        except Exception as e:
+            if chart_serial == self.chart_serial:
+                self.show_in_chart_frame(text=f"⚠️ Chart could not be rendered: {e}")
+            return
+        if cache_key:
+            image = self.chart_cache.put(cache_key, img_bytes)  # cached even if no longer wanted
+        else:
+            image = ImageTk.PhotoImage(Image.open(io.BytesIO(img_bytes)))
+        if chart_serial == self.chart_serial:
+            self.show_in_chart_frame(image=image)
+
+    def show_in_chart_frame(self, image=None, text=""):
         for widget in self.chart_frame.winfo_children():
             widget.destroy()
 
-        self.chart_label = ctk.CTkLabel(self.chart_frame, image=img_tk, text="")
-        self.chart_label.image = img_tk
+        self.chart_label = ctk.CTkLabel(
+            self.chart_frame, image=image, text=text,
+            font=ctk.CTkFont(size=15), text_color="#6B7280"
+        )
+        self.chart_label.image = image
         self.chart_label.pack(fill="both", expand=True, pady=10)
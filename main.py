@@ -1,13 +1,21 @@
 import customtkinter as ctk
+import multiprocessing
 from home_page import HomeTab
 from product_page import ProductTab
 from billing_page import BillingPage
 from summary_page import SummaryPage
 from charts_page import ChartsPage
+from utils.product_store import get_product_store, PRODUCTS_DB, STORE_BACKEND
+from utils.sales_ledger import SalesLedger
+from utils.bill_archive import get_bill_archive
+from utils.outbox import Outbox
+from utils.product_repository import ProductRepository
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
 
+PRODUCT_POLL_MS = 2000  # how often to check for catalog changes made by other tills
+
 
 class ShopApp(ctk.CTk):
     def __init__(self):
@@ -18,6 +26,13 @@ class ShopApp(ctk.CTk):
 
         self.pages = {}
         self.active_tab_btn = None
+        self.repository = ProductRepository(get_product_store())
+        # The ledger commits bills together with stock decrements, so it needs the SQLite store
+        self.ledger = SalesLedger(PRODUCTS_DB, self) if STORE_BACKEND == "sqlite" else None
+        self.outbox = Outbox()
+        archive = get_bill_archive()
+        if not len(archive):
+            archive.rebuild()  # first run: index bills written before the archive existed
 
         # --- Navigation Bar ---
         nav_bar_container = ctk.CTkFrame(self, fg_color="transparent")
@@ -69,14 +84,30 @@ class ShopApp(ctk.CTk):
 
         # Pages
         self.pages["Home"] = HomeTab(self.content_frame, tab_view=None)
-        self.pages["Products"] = ProductTab(self.content_frame)
-        self.pages["Billing"] = BillingPage(self.content_frame)
-        self.pages["Summary"] = SummaryPage(self.content_frame)
-        self.pages["Charts"] = ChartsPage(self.content_frame)
+        self.pages["Products"] = ProductTab(self.content_frame, self.repository)
+        self.pages["Billing"] = BillingPage(self.content_frame, self.repository, self.ledger, self.outbox)
+        self.pages["Summary"] = SummaryPage(self.content_frame, self.repository)
+        self.pages["Charts"] = ChartsPage(self.content_frame, self.repository)
 
         # Default tab
         self.show_page("Home")
         self.set_active_tab("Home")
+        self.after(PRODUCT_POLL_MS, self.poll_products)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        if self.ledger:
+            self.ledger.close()  # flush bills still waiting for their group commit
+        self.outbox.close()  # unsent messages stay queued for the next start
+        self.pages["Charts"].renderer.shutdown()  # drops a chart nobody will see
+        self.pages["Billing"].pdf_pool.shutdown(wait=False)  # queued invoices still get written
+        self.destroy()
+
+    def poll_products(self):
+        """ Pick up catalog changes written by other processes (one counter query); skipped
+        while our own bills are between the ledger's commit and apply_stock_levels """
+        self.repository.refresh_if_changed()
+        self.after(PRODUCT_POLL_MS, self.poll_products)
 
     def show_page(self, page_name):
         for widget in self.content_frame.winfo_children():
@@ -122,5 +153,6 @@ class ShopApp(ctk.CTk):
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # PDF worker processes in the PyInstaller build
     app = ShopApp()
     app.mainloop()
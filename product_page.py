@@ -1,30 +1,19 @@
 import customtkinter as ctk
 from PIL import Image
 from tkinter import messagebox
-from tkinter import ttk
-import json
-import os
-
-PRODUCTS_FILE = "data/products.json"
-
-def load_products():
-    if os.path.exists(PRODUCTS_FILE):
-        with open(PRODUCTS_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def save_products(products):
-    with open(PRODUCTS_FILE, "w") as f:
-        json.dump(products, f, indent=4)
+from utils.virtual_tree import VirtualTreeview
 
 class ProductTab(ctk.CTkFrame):
-    def __init__(self, parent):
+    def __init__(self, parent, repository):
         super().__init__(parent)
-        self.products = load_products()
-        self.selected_index = None
+        self.repository = repository
+        self.products = self.repository.all()
+        self.selected_id = None
+        self.selected_values = {}
         self.configure(fg_color="#f4f6f8")  # light professional background
         self.create_widgets()
         self.refresh_tree()
+        self.repository.subscribe(self.on_products_changed)
 
     def create_widgets(self):
         # --- Wrapper Frame ---
@@ -146,11 +135,25 @@ class ProductTab(ctk.CTkFrame):
         ).grid(row=button_row + 1, column=1, pady=5, padx=10)
 
         # --- Treeview ---
-        self.tree = ttk.Treeview(self.scrollable_frame, columns=tuple(self.fields.keys()), show="headings", height=12)
+        # Virtual table: only the rows in view are materialized in the Treeview
+        self.table = VirtualTreeview(
+            self.scrollable_frame,
+            columns=tuple(self.fields.keys()),
+            row_values=lambda p: tuple(p.get(k, "") for k in self.fields.keys()),
+            row_key=lambda index, p: p.id,
+            show="headings",
+            height=12
+        )
+        self.tree = self.table.tree
         for col in self.tree["columns"]:
             self.tree.heading(col, text=col.title())
             self.tree.column(col, anchor="center", width=120)
-        self.tree.grid(row=button_row + 2, column=0, columnspan=2, pady=15, sticky="nsew")
+        self.table.grid(row=button_row + 2, column=0, columnspan=2, pady=15, sticky="nsew")
+
+        # Inventory totals, read from the repository's materialized aggregates
+        self.totals_label = ctk.CTkLabel(self.scrollable_frame, text="", font=("Segoe UI", 12), text_color="#374151")
+        self.totals_label.grid(row=button_row + 3, column=0, columnspan=2, pady=(0, 10), sticky="w")
+        self.update_totals()
         self.scrollable_frame.grid_rowconfigure(button_row + 2, weight=1)
         self.scrollable_frame.grid_columnconfigure((0, 1), weight=1)
 
@@ -170,7 +173,9 @@ class ProductTab(ctk.CTkFrame):
                 widget.set("Grocery")
             else:
                 widget.delete(0, "end")
-        self.selected_index = None
+        self.selected_id = None
+        self.selected_values = {}
+        self.table.clear_selection()
 
     def add_product(self):
         new_product = {key: widget.get() for key, widget in self.fields.items()}
@@ -183,23 +188,39 @@ class ProductTab(ctk.CTkFrame):
         except ValueError:
             messagebox.showerror("Invalid Input", "Price must be a number and Stock must be an integer.")
             return
-        self.products.append(new_product)
-        save_products(self.products)
-        self.refresh_tree()
+        self.repository.add(new_product)
         self.clear_fields()
         messagebox.showinfo("Success", "Product added successfully!")
 
+    def on_products_changed(self, event, product):
+        # Patch the single affected row; the table edits self.products in place
+        if event == "add":
+            self.table.insert_row(product)
+        elif event == "update":
+            self.table.update_row(product)
+        elif event == "delete":
+            self.table.remove_row(product.id)
+        else:
+            self.products = self.repository.all()
+            self.refresh_tree()
+        self.update_totals()
+
+    def update_totals(self):
+        totals = self.repository.aggregates.overall
+        self.totals_label.configure(
+            text=f"📦 {totals.count} products  |  🧮 {totals.stock} units in stock  |  💰 Stock value ₹{totals.value:,.2f}"
+        )
+
     def refresh_tree(self):
-        self.tree.delete(*self.tree.get_children())
-        for index, p in enumerate(self.products):
-            values = tuple(p.get(k, "") for k in self.fields.keys())
-            self.tree.insert("", "end", iid=index, values=values)
+        self.table.set_rows(self.products)
 
     def on_row_selected(self, event):
         selected_item = self.tree.focus()
         if selected_item:
-            self.selected_index = int(selected_item)
+            self.selected_id = int(selected_item)
             selected_data = self.tree.item(selected_item)["values"]
+            # What the form starts from, so Update can write only what the user changed
+            self.selected_values = {key: str(selected_data[i]) for i, key in enumerate(self.fields)}
             for i, key in enumerate(self.fields):
                 widget = self.fields[key]
                 if isinstance(widget, ctk.CTkComboBox):
@@ -209,7 +230,7 @@ class ProductTab(ctk.CTkFrame):
                     widget.insert(0, selected_data[i])
 
     def update_product(self):
-        if self.selected_index is None:
+        if self.selected_id is None:
             messagebox.showwarning("Warning", "Select a product to update.")
             return
         updated_product = {key: widget.get() for key, widget in self.fields.items()}
@@ -222,20 +243,25 @@ class ProductTab(ctk.CTkFrame):
         except ValueError:
             messagebox.showerror("Invalid Input", "Price must be a number and Stock must be an integer.")
             return
-        self.products[self.selected_index] = updated_product
-        save_products(self.products)
-        self.refresh_tree()
+        changes = {
+            key: value for key, value in updated_product.items()
+            if str(self.fields[key].get()) != self.selected_values.get(key)
+        }
+        if self.repository.get(self.selected_id) is None:
+            messagebox.showerror("Not Found", "This product was deleted in the meantime.")
+            self.clear_fields()
+            return
+        if changes:
+            self.repository.update_fields(self.selected_id, changes)
         self.clear_fields()
         messagebox.showinfo("Success", "Product updated successfully!")
 
     def delete_product(self):
-        if self.selected_index is None:
+        if self.selected_id is None:
             messagebox.showwarning("Warning", "Select a product to delete.")
             return
         confirm = messagebox.askyesno("Confirm", "Are you sure you want to delete this product?")
         if confirm:
-            self.products.pop(self.selected_index)
-            save_products(self.products)
-            self.refresh_tree()
+            self.repository.delete(self.selected_id)
             self.clear_fields()
             messagebox.showinfo("Deleted", "Product deleted successfully!")
\ No newline at end of file
@@ -1,29 +1,25 @@
 import customtkinter as ctk
 from tkinter import ttk, filedialog, messagebox
-from datetime import datetime, timedelta
+from bisect import bisect_left
+from datetime import datetime
 import pandas as pd
-import os
-import json
 from PIL import Image
-
-PRODUCTS_FILE = "data/products.json"
-
-def load_all_products():
-    if os.path.exists(PRODUCTS_FILE):
-        with open(PRODUCTS_FILE, "r") as f:
-            return json.load(f)
-    return []
+from utils.product_store import PRODUCT_FIELDS
+from utils.virtual_tree import VirtualTreeview
+from utils.date_index import period_range
+from utils.normalizer import parse_date
 
 class SummaryPage(ctk.CTkFrame):
-    def __init__(self, master):
+    def __init__(self, master, repository):
         super().__init__(master)
         self.configure(fg_color="#f4f6f8")
-        self.columns = [
-            "name", "category", "brand", "unit", "price", "stock",
-            "customer", "date", "sku", "expiry", "discount", "notes"
-        ]
+        self.repository = repository
+        self.shown_filter = None
+        self.active_range = None  # (start, end) of the applied date filter; None shows everything
+        self.columns = list(PRODUCT_FIELDS)
         self.create_ui()
         self.refresh_data()
+        self.repository.subscribe(self.on_products_changed)
 
     def create_ui(self):
         wrapper = ctk.CTkFrame(self, fg_color="#f4f6f8")
@@ -48,7 +44,11 @@ class SummaryPage(ctk.CTkFrame):
         self.filter_box = ctk.CTkComboBox(
             top_bar,
             variable=self.filter_var,
-            values=["All", "Today", "Yesterday", "Last 7 Days"],
+            values=[
+                "All", "Today", "Yesterday", "Last 7 Days", "Last 30 Days",
+                "This Month", "Last Month", "This Quarter", "Last Quarter",
+                "This Year", "Custom Range"
+            ],
             command=self.apply_filter,
             width=180,
             font=ctk.CTkFont(size=13),
@@ -62,6 +62,22 @@ class SummaryPage(ctk.CTkFrame):
         self.filter_box.set("All")
         self.filter_box.pack(side="left", padx=(0, 10))
 
+        # Custom range (used when "Custom Range" is selected)
+        self.from_entry = ctk.CTkEntry(top_bar, placeholder_text="From (YYYY-MM-DD)", width=140)
+        self.from_entry.pack(side="left", padx=(0, 5))
+        self.to_entry = ctk.CTkEntry(top_bar, placeholder_text="To (YYYY-MM-DD)", width=140)
+        self.to_entry.pack(side="left", padx=(0, 5))
+        ctk.CTkButton(
+            top_bar,
+            text="Apply",
+            command=self.apply_custom_range,
+            fg_color="#2563eb",
+            hover_color="#1d4ed8",
+            text_color="white",
+            width=70,
+            corner_radius=8
+        ).pack(side="left")
+
         ctk.CTkButton(
             top_bar,
             text="🔁 Refresh Summary",
@@ -88,6 +104,9 @@ class SummaryPage(ctk.CTkFrame):
 
         ctk.CTkLabel(card, text="📋 All Product Records", font=ctk.CTkFont(size=16, weight="bold"), text_color="#1f2937").pack(anchor="center", pady=(10, 5))
 
+        self.issues_label = ctk.CTkLabel(card, text="", font=ctk.CTkFont(size=12), text_color="#b45309")
+        self.issues_label.pack(anchor="center")
+
         table_frame = ctk.CTkFrame(card, fg_color="#f9fafb", corner_radius=12)
         table_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
 
@@ -95,65 +114,108 @@ class SummaryPage(ctk.CTkFrame):
         style.configure("Treeview.Heading", font=("Arial", 11, "bold"))
         style.configure("Treeview", font=("Arial", 10), rowheight=28)
 
-        self.tree = ttk.Treeview(table_frame, columns=self.columns, show="headings")
+        self.table = VirtualTreeview(
+            table_frame,
+            columns=self.columns,
+            row_values=lambda item: tuple(str(getattr(item, k)) for k in self.columns),
+            row_key=lambda index, item: item.id,
+            show="headings"
+        )
+        self.tree = self.table.tree
 
         for col in self.columns:
             heading_text = col.replace("_", " ").title()
             self.tree.heading(col, text=heading_text)
             self.tree.column(col, anchor="center", width=120)
 
-        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb.set)
-        vsb.pack(side="right", fill="y")
-        self.tree.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self.table.pack(fill="both", expand=True, padx=10, pady=(0, 10))
 
         ctk.CTkLabel(wrapper, text="© 2025 Shop Summary | Design by Vaibhav Gaikwad", font=ctk.CTkFont(size=12), text_color="#9ca3af").pack(pady=(0, 10))
 
     def display_products(self, data):
-        self.tree.delete(*self.tree.get_children())
-        for item in data:
-            values = tuple(str(item.get(k, "")) for k in self.columns)
-            self.tree.insert("", "end", values=values)
+        # Jump back to the top only when the filter changed, not when the data did
+        choice = self.filter_var.get()
+        self.table.set_rows(data, reset=choice != self.shown_filter)
+        self.shown_filter = choice
 
     def apply_filter(self, *_):
         choice = self.filter_var.get()
-        today = datetime.today().date()
-        yesterday = today - timedelta(days=1)
-        self.filtered_products = []
 
         if choice == "All":
-            self.filtered_products = self.products.copy()
+            self.active_range = None
+            self.filtered_products = self.repository.all()
         else:
-            for item in self.products:
-                date_str = item.get("date", "").strip()
-                if not date_str or date_str.lower() == "n/a":
-                    continue
-
-                item_date = None
-                for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
-                    try:
-                        item_date = datetime.strptime(date_str, fmt).date()
-                        break
-                    except ValueError:
-                        continue
-
-                if not item_date:
-                    continue
-
-                if choice == "Today" and item_date == today:
-                    self.filtered_products.append(item)
-                elif choice == "Yesterday" and item_date == yesterday:
-                    self.filtered_products.append(item)
-                elif choice == "Last 7 Days" and today - timedelta(days=7) <= item_date <= today:
-                    self.filtered_products.append(item)
+            if choice == "Custom Range":
+                try:
+                    start, end = self.custom_range()
+                except ValueError:
+                    messagebox.showwarning("Invalid Date", "Enter dates as YYYY-MM-DD or DD-MM-YYYY.")
+                    return
+            else:
+                start, end = period_range(choice, datetime.today().date())
+            # Sorted date index: bisect to the bounds and slice
+            self.active_range = (start, end)
+            self.filtered_products = self.repository.in_date_range(start, end)
 
         self.display_products(self.filtered_products)
 
+    def custom_range(self):
+        """ Parse the From/To entries; a blank entry leaves that end of the range open """
+        start_text = self.from_entry.get().strip()
+        end_text = self.to_entry.get().strip()
+        start = parse_date(start_text) if start_text else None
+        end = parse_date(end_text) if end_text else None
+        return start, end
+
+    def apply_custom_range(self):
+        self.filter_var.set("Custom Range")
+        self.apply_filter()
+
+    def in_active_range(self, record):
+        if self.active_range is None:
+            return True
+        start, end = self.active_range
+        day = record.purchase_date
+        return day is not None and (start is None or day >= start) and (end is None or day <= end)
+
+    def insert_filtered(self, record):
+        """ Insert a record into the shown rows at the position the current filter would give it """
+        if not self.in_active_range(record):
+            return
+        if self.active_range is None:
+            self.table.insert_row(record)  # "All" lists products in insertion order
+        else:
+            index = bisect_left(
+                self.filtered_products, (record.purchase_date, record.id),
+                key=lambda r: (r.purchase_date, r.id)
+            )
+            self.table.insert_row(record, index)
+
+    def on_products_changed(self, event, product):
+        # Patch only the affected row of the current filter; the table edits
+        # self.filtered_products in place
+        if event == "add":
+            self.insert_filtered(product)
+        elif event == "update":
+            index = self.table.index_of_key(product.id)
+            old = self.filtered_products[index] if index is not None else None
+            if old is not None and self.in_active_range(product) and (
+                    self.active_range is None or old.purchase_date == product.purchase_date):
+                self.table.update_row(product)
+            else:
+                self.table.remove_row(product.id)
+                self.insert_filtered(product)
+        elif event == "delete":
+            self.table.remove_row(product.id)
+        else:
+            self.apply_filter()
+        bad_rows = len(self.repository.validation_report)
+        self.issues_label.configure(text=f"⚠️ {bad_rows} product(s) have invalid price, stock or date values" if bad_rows else "")
+
     def refresh_data(self):
-        self.products = load_all_products()
         self.filter_var.set("All")
-        self.filtered_products = self.products.copy()
-        self.display_products(self.filtered_products)
+        if not self.repository.refresh_if_changed():
+            self.on_products_changed("reload", None)
 
     def export_to_excel(self):
         if not self.filtered_products:
@@ -167,7 +229,7 @@ class SummaryPage(ctk.CTkFrame):
         )
         if file_path:
             try:
-                df = pd.DataFrame(self.filtered_products)
+                df = pd.DataFrame([p.to_dict() for p in self.filtered_products], columns=self.columns)
                 df.to_excel(file_path, index=False)
                 messagebox.showinfo("Success", f"Exported successfully:\n{file_path}")
             except Exception as e:
@@ -0,0 +1,76 @@
+import tkinter
+import pytest
+
+ctk = pytest.importorskip("customtkinter")
+
+from billing_page import BillingPage
+from utils.outbox import Outbox, FakeTransport
+from utils.product_repository import ProductRepository
+from utils.product_store import SQLiteProductStore
+
+
+@pytest.fixture
+def root():
+    try:
+        root = ctk.CTk()
+    except tkinter.TclError:
+        pytest.skip("no display available")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+@pytest.fixture
+def page(root, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # bills/ and data/ files go to the temp folder
+    store = SQLiteProductStore(str(tmp_path / "products.db"), None)
+    repository = ProductRepository(store)
+    repository.add({"name": "Soap", "price": 20, "stock": 50, "sku": "111"})
+    repository.add({"name": "Rice", "price": 60, "stock": 50, "sku": "222"})
+    outbox = Outbox(str(tmp_path / "outbox.db"), transport=FakeTransport())
+    page = BillingPage(root, repository, outbox=outbox)
+    yield page
+    page.pdf_pool.shutdown(wait=False)
+    outbox.close()
+    store.close()
+
+
+def scan(page, code):
+    page.scan_var.set(code)
+    page.on_scan(None)
+
+
+def quantities(page):
+    return {line.name: line.quantity for line in page.cart}
+
+
+def test_scans_are_queued_and_applied_together_when_idle(page, root):
+    for code in ("111", "111", "222"):
+        scan(page, code)
+    assert len(page.cart) == 0
+    assert list(page.scan_queue) == ["111", "111", "222"]
+
+    root.update()
+
+    assert quantities(page) == {"Soap": 2, "Rice": 1}
+    assert not page.scan_queue
+    assert page.scan_job is None
+
+
+def test_unknown_sku_is_reported_and_others_still_added(page, root):
+    scan(page, "111")
+    scan(page, "999")
+    root.update()
+
+    assert quantities(page) == {"Soap": 1}
+    assert "999" in page.scan_status_label.cget("text")
+
+
+def test_suggestion_refresh_keeps_queued_scans(page, root):
+    scan(page, "222")
+    page.update_suggestions()
+    page.repository.add({"name": "Dal", "price": 90, "stock": 5, "sku": "333"})  # publishes a delta
+    scan(page, "222")
+    root.update()
+
+    assert quantities(page) == {"Rice": 2}
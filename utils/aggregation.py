@@ -0,0 +1,71 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+UNKNOWN_CATEGORY = "Unknown"
+DENSITY_BINS = 60  # per axis in the price vs stock density grid
+
+QUANTILE_COLUMNS = ["price_min", "price_q1", "price_median", "price_q3", "price_max"]
+
+
+def category_price_quantiles(records):
+    """Per-category price quantiles (min, q1, median, q3, max) for the box plot.
+
+    Only valid prices are used; categories without one are left out.
+    Counts, stock and value live in the repository's materialized totals.
+    """
+    rows = [(r.category or UNKNOWN_CATEGORY, r.price) for r in records if r.is_valid("price")]
+    if not rows:
+        return pd.DataFrame(columns=QUANTILE_COLUMNS, index=pd.Index([], name="category"))
+
+    frame = pd.DataFrame.from_records(rows, columns=["category", "price"])
+    quantiles = frame.groupby("category", sort=True)["price"].quantile([0, 0.25, 0.5, 0.75, 1]).unstack()
+    quantiles.columns = QUANTILE_COLUMNS
+    return quantiles
+
+
+class CategoryAggregator:
+    """category_price_quantiles() for a repository, recomputed only when its data_version changes."""
+
+    def __init__(self, repository):
+        self.repository = repository
+        self.version = None
+        self.frame = None
+
+    def get(self):
+        version = self.repository.data_version
+        if version != self.version:
+            self.frame = category_price_quantiles(self.repository.all())
+            self.version = version
+        return self.frame
+
+
+def price_stock_density(records, bins=DENSITY_BINS):
+    """Bin products into a bins x bins price/stock grid.
+
+    Returns (price centers, stock centers, counts) with counts[stock][price],
+    empty cells as None so a heatmap leaves them blank. The result's size
+    depends only on ``bins``, not on how many products there are.
+    """
+    prices = np.fromiter((r.price for r in records), dtype=float)
+    stocks = np.fromiter((r.stock for r in records), dtype=float)
+    counts, price_edges, stock_edges = np.histogram2d(prices, stocks, bins=bins)
+    price_centers = ((price_edges[:-1] + price_edges[1:]) / 2).round(2).tolist()
+    stock_centers = ((stock_edges[:-1] + stock_edges[1:]) / 2).round(1).tolist()
+    grid = [[int(n) or None for n in row] for row in counts.T]
+    return price_centers, stock_centers, grid
+
+
+def notable_products(records, limit):
+    """The products worth labelling on a scatter: the top ``limit`` by stock
+    value plus the highest-priced and highest-stocked ones, without repeats."""
+    picked = {}
+    per_rule = max(1, limit // 2)
+    for key, n in (
+        (lambda r: r.price * r.stock, per_rule),
+        (lambda r: r.price, (limit - per_rule + 1) // 2),
+        (lambda r: r.stock, (limit - per_rule) // 2),
+    ):
+        for record in heapq.nlargest(n, records, key=key):
+            picked.setdefault(record.id, record)
+    return list(picked.values())[:limit]
@@ -0,0 +1,107 @@
+import http.client
+import json
+from urllib.parse import quote, urlencode
+
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+RETRY_METHODS = {"GET", "HEAD", "PUT", "DELETE"}  # safe to resend if the connection drops
+
+
+class ApiRequestError(Exception):
+    """A request the API refused; ``status`` is the HTTP status, ``payload`` the JSON body."""
+
+    def __init__(self, status, payload):
+        super().__init__(payload.get("error", f"HTTP {status}") if isinstance(payload, dict) else f"HTTP {status}")
+        self.status = status
+        self.payload = payload
+
+
+class CatalogClient:
+    """Blocking client for utils.api_service.
+
+    Keeps one HTTP/1.1 connection open and reuses it for every request
+    (reconnecting once if the server closed it in between; only idempotent
+    requests are resent, since a dropped POST /bills may already have been
+    recorded). Not thread-safe: give each thread its own client.
+    """
+
+    def __init__(self, host=API_HOST, port=API_PORT, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        payload = None if body is None else json.dumps(body).encode("utf-8")
+        headers = dict(headers or {})
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+        attempts = 2 if method in RETRY_METHODS else 1
+        for attempt in range(1, attempts + 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=payload, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionError):
+                # Idle keep-alive connection was dropped by the server; retry on a new one if safe
+                self.close()
+                if attempt == attempts:
+                    raise
+        result = json.loads(data) if data else None
+        if response.will_close:
+            self.close()
+        if response.status >= 400:
+            raise ApiRequestError(response.status, result)
+        return result
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    # ------------------ CATALOG ------------------
+
+    def suggest(self, prefix, limit=10):
+        return self.request("GET", "/products?" + urlencode({"q": prefix, "limit": limit}))["products"]
+
+    def list_products(self, offset=0, limit=100):
+        return self.request("GET", "/products?" + urlencode({"offset": offset, "limit": limit}))["products"]
+
+    def get_product(self, product_id):
+        return self.request("GET", f"/products/{product_id}")
+
+    def find_by_sku(self, sku):
+        try:
+            return self.request("GET", f"/products/sku/{quote(sku, safe='')}")
+        except ApiRequestError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def add_product(self, product):
+        return self.request("POST", "/products", product)
+
+    def update_product(self, product_id, changes, etag):
+        """Apply changes if the product still has ``etag``; raises ApiRequestError(412) otherwise."""
+        return self.request("PUT", f"/products/{product_id}", changes, {"If-Match": etag})
+
+    def delete_product(self, product_id, etag):
+        return self.request("DELETE", f"/products/{product_id}", headers={"If-Match": etag})
+
+    # ------------------ BILLING ------------------
+
+    def price_cart(self, lines, gst_percent=0, discount_percent=0):
+        """``lines`` is a list of {"product_id" or "sku", "quantity"} dicts."""
+        return self.request("POST", "/cart/price", {
+            "lines": lines, "gst_percent": gst_percent, "discount_percent": discount_percent
+        })
+
+    def finalize_bill(self, customer, contact, lines, gst_percent=0, discount_percent=0):
+        """Commit a bill; raises ApiRequestError(409) if a line's stock ran out meanwhile."""
+        return self.request("POST", "/bills", {
+            "customer": customer, "contact": contact, "lines": lines,
+            "gst_percent": gst_percent, "discount_percent": discount_percent
+        })
@@ -0,0 +1,445 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs, unquote
+from utils.cart import Cart
+from utils.normalizer import REQUIRED_FIELDS
+from utils.product_record import ProductRecord
+from utils.product_repository import ProductRepository
+from utils.product_store import (
+    get_product_store, PRODUCTS_DB, PRODUCT_FIELDS, insert_product, update_product, delete_product, read_product
+)
+from utils.sales_ledger import InsufficientStock, open_ledger_connection, write_bill
+
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADERS = 100
+KEEPALIVE_TIMEOUT_S = 30
+DEFAULT_PAGE_SIZE = 100
+REFRESH_INTERVAL_S = 1.0  # how often to look for writes made outside the API
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.payload = {"error": message, **details}
+
+
+def etag(record):
+    """Version tag of a product: changes whenever any of its fields change."""
+    data = json.dumps(record.to_dict(), sort_keys=True, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+
+def record_json(record):
+    data = record.to_dict()
+    data["etag"] = etag(record)
+    return data
+
+
+def money(value):
+    return str(value)  # Decimal as a string, so clients don't get float rounding
+
+
+class CatalogService:
+    """Headless catalog and billing API so several counters share one store.
+
+    Run it next to the data folder with ``python -m utils.api_service`` and
+    point tills or scripts at it (see utils.api_client). HTTP/1.1 with
+    keep-alive on asyncio streams; no outside services.
+
+        GET    /products?q=<prefix>&limit=N     type-ahead search (or a page of the catalog)
+        GET    /products/<id>                   one product, with its ETag
+        GET    /products/sku/<sku>              barcode lookup
+        POST   /products                        add a product
+        PUT    /products/<id>                   update; requires If-Match: <etag>
+        DELETE /products/<id>                   delete; requires If-Match: <etag>
+        POST   /cart/price                      price a cart with the current catalog
+        POST   /bills                           finalize a bill and decrement stock
+
+    Concurrency is optimistic: product edits must quote the ETag they were
+    based on and get 412 if the product changed since, and a bill only
+    commits if every line's stock is still available (409 otherwise). Both
+    checks are made by the SQL itself (the edit is conditional on the row's
+    version), not just against the in-memory copy.
+
+    Reads are served from the repository's in-memory indexes on the event
+    loop. Every write goes through a single writer thread with its own
+    SQLite connection (fsync on commit), so the loop never waits on the
+    database's write lock; the written rows are then applied to the
+    repository back on the loop. Writes made outside the API are picked up
+    by ``watch_store``, a timer comparing write counters, not per request.
+    """
+
+    def __init__(self, repository, db_path=PRODUCTS_DB):
+        self.repository = repository
+        self.db_path = db_path
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.conn = None  # owned by the writer thread
+
+    # ------------------ HTTP ------------------
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self.read_request(reader), KEEPALIVE_TIMEOUT_S)
+                except ApiError as e:
+                    await self.write_response(writer, e.status, e.payload, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload, extra = await self.dispatch(method, target, headers, body)
+                except ApiError as e:
+                    status, payload, extra = e.status, e.payload, {}
+                except Exception as e:
+                    status, payload, extra = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}, {}
+                await self.write_response(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split()
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise ApiError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    async def write_response(self, writer, status, payload, keep_alive=True, headers=None):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        lines = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        data = None
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+
+        if parts[:1] == ["products"]:
+            if len(parts) == 1 and method == "GET":
+                return self.list_products(query)
+            if len(parts) == 1 and method == "POST":
+                return await self.add_product(data)
+            if len(parts) == 3 and parts[1] == "sku" and method == "GET":
+                return self.product_response(self.repository.find_by_sku(parts[2]))
+            if len(parts) == 2:
+                product_id = self.parse_id(parts[1])
+                if method == "GET":
+                    return self.product_response(self.repository.get(product_id))
+                if method == "PUT":
+                    return await self.update_product(product_id, headers, data)
+                if method == "DELETE":
+                    return await self.delete_product(product_id, headers)
+        elif parts == ["cart", "price"] and method == "POST":
+            cart, gst, discount = self.build_cart(data)
+            return HTTPStatus.OK, self.cart_json(cart, gst, discount), {}
+        elif parts == ["bills"] and method == "POST":
+            return await self.finalize_bill(data)
+        raise ApiError(HTTPStatus.NOT_FOUND, f"No route for {method} {url.path}")
+
+    # ------------------ CATALOG ------------------
+
+    @staticmethod
+    def parse_id(value):
+        try:
+            return int(value)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Invalid product id: {value}")
+
+    def product_response(self, record):
+        if record is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "Product not found")
+        return HTTPStatus.OK, record_json(record), {"ETag": etag(record)}
+
+    def list_products(self, query):
+        try:
+            limit = int(query.get("limit", DEFAULT_PAGE_SIZE))
+            offset = int(query.get("offset", 0))
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "limit and offset must be integers")
+        if "q" in query:
+            names = self.repository.suggest(query["q"], limit)
+            records = [self.repository.find_by_name(name) for name in names]
+        else:
+            records = self.repository.all()[offset:offset + limit]
+        return HTTPStatus.OK, {"products": [record_json(r) for r in records if r is not None]}, {}
+
+    @staticmethod
+    def check_values(product):
+        """Refuse a product whose price or stock can't be parsed (it would be stored as 0)."""
+        record = ProductRecord.from_dict(product)
+        invalid = {field: message for field, _, message in record.issues if field in REQUIRED_FIELDS}
+        if invalid:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Invalid price or stock", fields=invalid)
+        return record
+
+    async def add_product(self, data):
+        if not isinstance(data, dict) or not data.get("name"):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "A product needs at least a name")
+        record = self.check_values(data)
+
+        def insert(conn):
+            return read_product(conn, insert_product(conn, record.to_dict()))
+
+        record = ProductRecord.from_dict(await self.write(insert))
+        self.repository.adopt(record)
+        status, payload, extra = self.product_response(record)
+        return HTTPStatus.CREATED, payload, extra
+
+    def check_etag(self, product_id, headers):
+        current = self.repository.get(product_id)
+        if current is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "Product not found")
+        expected = headers.get("if-match", "").strip('"')
+        if not expected:
+            raise ApiError(HTTPStatus.PRECONDITION_REQUIRED, "Send If-Match with the product's ETag")
+        if expected != etag(current):
+            raise ApiError(
+                HTTPStatus.PRECONDITION_FAILED, "Product was changed by someone else",
+                product=record_json(current)
+            )
+        return current
+
+    def changed_by_someone_else(self, product_id, row):
+        """The conditional write matched nothing: adopt the row as it is now and report why."""
+        if row is None:
+            self.repository.forget(product_id, written=False)
+            raise ApiError(HTTPStatus.NOT_FOUND, "Product not found")
+        current = ProductRecord.from_dict(row)
+        self.repository.adopt(current, written=False)
+        raise ApiError(
+            HTTPStatus.PRECONDITION_FAILED, "Product was changed by someone else",
+            product=record_json(current)
+        )
+
+    async def update_product(self, product_id, headers, data):
+        current = self.check_etag(product_id, headers)
+        if not isinstance(data, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body must be a product object")
+        product = current.to_dict()
+        product.update({k: v for k, v in data.items() if k not in ("id", "etag", "version")})
+        values = self.check_values(product).to_dict()
+        # Only the fields the client sent are written; the rest (e.g. stock a
+        # bill just decremented) stay as they are in the database
+        changes = {k: values[k] for k in PRODUCT_FIELDS if k in data}
+
+        def update(conn):
+            updated = update_product(conn, product_id, changes, expected_version=current.version)
+            return updated, read_product(conn, product_id)
+
+        updated, row = await self.write(update)
+        if not updated:
+            self.changed_by_someone_else(product_id, row)
+        record = ProductRecord.from_dict(row)
+        self.repository.adopt(record)
+        return self.product_response(record)
+
+    async def delete_product(self, product_id, headers):
+        current = self.check_etag(product_id, headers)
+
+        def delete(conn):
+            if delete_product(conn, product_id, expected_version=current.version):
+                return True, None
+            return False, read_product(conn, product_id)
+
+        deleted, row = await self.write(delete)
+        if not deleted:
+            self.changed_by_someone_else(product_id, row)
+        self.repository.forget(product_id)
+        return HTTPStatus.OK, {"deleted": product_id}, {}
+
+    # ------------------ CART & BILLS ------------------
+
+    def build_cart(self, data):
+        """Price cart lines ``[{"product_id"|"sku", "quantity"}]`` with catalog prices."""
+        if not isinstance(data, dict) or not isinstance(data.get("lines"), list):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Body needs a list of lines")
+        try:
+            gst = float(data.get("gst_percent", 0))
+            discount = float(data.get("discount_percent", 0))
+        except (TypeError, ValueError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "gst_percent and discount_percent must be numbers")
+        cart = Cart()
+        for line in data["lines"]:
+            if not isinstance(line, dict):
+                raise ApiError(HTTPStatus.BAD_REQUEST, "Each line must be an object")
+            if "sku" in line:
+                record = self.repository.find_by_sku(str(line["sku"]))
+            else:
+                product_id = line.get("product_id")
+                if type(product_id) is not int:
+                    raise ApiError(HTTPStatus.BAD_REQUEST, "product_id must be an integer", line=line)
+                record = self.repository.get(product_id)
+            if record is None:
+                raise ApiError(HTTPStatus.NOT_FOUND, "Product not found", line=line)
+            quantity = line.get("quantity", 1)
+            # type() rather than isinstance(): JSON true/false would pass as 1/0
+            if type(quantity) is not int or quantity <= 0:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "Quantity must be a positive integer", line=line)
+            cart.add(record.id, record.name, record.price, quantity)
+        return cart, gst, discount
+
+    @staticmethod
+    def cart_json(cart, gst, discount):
+        totals = cart.totals(gst, discount)
+        return {
+            "lines": [
+                {
+                    "product_id": line.product_id, "name": line.name, "quantity": line.quantity,
+                    "price": money(line.price), "total": money(line.total)
+                }
+                for line in cart
+            ],
+            "gst_percent": gst,
+            "discount_percent": discount,
+            "subtotal": money(totals.subtotal),
+            "discount_amount": money(totals.discount_amount),
+            "gst_amount": money(totals.gst_amount),
+            "total": money(totals.total),
+        }
+
+    async def finalize_bill(self, data):
+        cart, gst, discount = self.build_cart(data)
+        if not cart:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "The bill has no lines")
+        customer = str(data.get("customer") or "").strip()
+        if not customer:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Customer name is required")
+        totals = cart.totals(gst, discount)
+        bill = {
+            "customer": customer,
+            "contact": str(data.get("contact") or ""),
+            "gst_percent": gst,
+            "discount_percent": discount,
+            "subtotal": float(totals.subtotal),
+            "total": float(totals.total),
+            "lines": [
+                (line.product_id, line.name, line.quantity, float(line.price), float(line.total))
+                for line in cart
+            ]
+        }
+        try:
+            result = await self.write(write_bill, bill)
+        except InsufficientStock as e:
+            current = self.repository.get(e.product_id)
+            raise ApiError(
+                HTTPStatus.CONFLICT, str(e), product_id=e.product_id,
+                stock=current.stock if current else None
+            )
+        self.repository.apply_stock_levels(result.stock)
+        payload = self.cart_json(cart, gst, discount)
+        payload.update(bill_id=result.bill_id, stock=result.stock)
+        return HTTPStatus.CREATED, payload, {}
+
+    # ------------------ WRITER THREAD ------------------
+
+    async def write(self, operation, *args):
+        """Run ``operation(conn, *args)`` in one transaction on the writer thread.
+
+        The caller applies the result to the repository right after this
+        returns (without awaiting in between), so the write stays counted
+        as in flight until then.
+        """
+        loop = asyncio.get_running_loop()
+        self.repository.writes_in_flight += 1
+        try:
+            return await loop.run_in_executor(self.writer, self.transaction, operation, args)
+        except sqlite3.Error as e:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, f"Could not save the change: {e}")
+        finally:
+            self.repository.writes_in_flight -= 1
+
+    async def watch_store(self, interval=REFRESH_INTERVAL_S):
+        """Pick up writes made directly to the store (e.g. a till not using the API)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.repository.refresh_if_changed()
+            except sqlite3.Error as e:
+                print(f"Could not check the catalog for changes: {e}")
+
+    def transaction(self, operation, args):
+        # Runs on the writer thread
+        if self.conn is None:
+            self.conn = open_ledger_connection(self.db_path)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = operation(self.conn, *args)
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return result
+
+
+async def serve(host=API_HOST, port=API_PORT):
+    # The ledger tables live next to the products table, so the API needs the SQLite store
+    service = CatalogService(ProductRepository(get_product_store("sqlite")), PRODUCTS_DB)
+    server = await asyncio.start_server(service.handle_client, host, port)
+    watcher = asyncio.create_task(service.watch_store())
+    print(f"Catalog API listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the product catalog and billing API.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import json
+import os
+import re
+import sqlite3
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+BILLS_DIR = "bills"
+BILLS_INDEX = "data/bills.db"
+# "pdf" writes every invoice to bills/ at checkout; "record" stores compact bill
+# records and renders PDFs only when one is needed (see utils.pdf_cache)
+BILL_STORAGE = "pdf"
+
+# path is set for invoice files, record_id for stored bill records
+ArchivedBill = namedtuple("ArchivedBill", ["path", "record_id", "customer", "contact", "created_at", "total"])
+
+# <customer>_<dd-mm-YYYY>_<HH-MM-SS>[_n].pdf, as written by claim_bill_path
+_BILL_NAME = re.compile(r"^(?P<customer>.+)_(?P<stamp>\d{2}-\d{2}-\d{4}_\d{2}-\d{2}-\d{2})(?:_\d+)?\.pdf$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    path TEXT PRIMARY KEY,
+    customer TEXT NOT NULL,
+    customer_key TEXT NOT NULL,
+    contact TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    total REAL
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_customer ON invoices(customer_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_invoices_contact ON invoices(contact, created_at);
+CREATE INDEX IF NOT EXISTS idx_invoices_created ON invoices(created_at);
+CREATE TABLE IF NOT EXISTS bill_records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer TEXT NOT NULL,
+    customer_key TEXT NOT NULL,
+    contact TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    total REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bill_records_customer ON bill_records(customer_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_bill_records_contact ON bill_records(contact, created_at);
+CREATE INDEX IF NOT EXISTS idx_bill_records_created ON bill_records(created_at);
+"""
+
+
+def shard_folder(bills_dir, when):
+    """bills/<YYYY>/<MM>/<DD>: keeps each directory down to one day of invoices."""
+    return os.path.join(bills_dir, f"{when:%Y}", f"{when:%m}", f"{when:%d}")
+
+
+def parse_bill_filename(filename):
+    """Return (customer, created_at) from a bill file name, or None if it isn't one."""
+    match = _BILL_NAME.match(filename)
+    if not match:
+        return None
+    try:
+        created_at = datetime.strptime(match.group("stamp"), "%d-%m-%Y_%H-%M-%S")
+    except ValueError:
+        return None
+    return match.group("customer").replace("_", " "), created_at
+
+
+class BillArchive:
+    """SQLite index over the invoice PDFs in the bills folder.
+
+    generate_pdf records every file it writes (customer, contact, date,
+    total, path), so looking up a customer's invoices or a day's invoices is
+    an indexed query instead of a directory listing. Bills kept as compact
+    records (BILL_STORAGE = "record") live in the same database and show up
+    in the same lookups with a record_id instead of a path. ``rebuild`` re-creates
+    the index by scanning the folder, for bills written before the index
+    existed or after files were copied in by hand. The index is safe to
+    share between the app and the PDF worker processes.
+    """
+
+    def __init__(self, db_path=BILLS_INDEX):
+        self.path = db_path
+        folder = os.path.dirname(db_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30)  # PDF workers write concurrently
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def record(self, path, customer, contact="", created_at=None, total=None):
+        created_at = created_at or datetime.now()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO invoices (path, customer, customer_key, contact, created_at, total) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    os.path.normpath(path), customer, customer.strip().lower(), contact or "",
+                    created_at.isoformat(timespec="seconds"), None if total is None else float(total)
+                )
+            )
+
+    def forget(self, path):
+        with self.conn:
+            self.conn.execute("DELETE FROM invoices WHERE path = ?", (os.path.normpath(path),))
+
+    def save_record(self, bill, created_at=None, total=None):
+        """Store the generate_pdf keyword arguments of a bill and return its record id.
+
+        A record is a few hundred bytes of JSON instead of a PDF carrying its
+        own copy of the logo and fonts; render it with utils.pdf_cache.
+        """
+        created_at = created_at or datetime.now()
+        data = dict(bill)
+        data.pop("bill_date", None)  # stored as created_at
+        customer = data.get("customer_name", "")
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO bill_records (customer, customer_key, contact, created_at, total, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    customer, customer.strip().lower(), data.get("customer_contact", ""),
+                    created_at.isoformat(timespec="seconds"), None if total is None else float(total),
+                    json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+                )
+            )
+        return cur.lastrowid
+
+    def get_record(self, record_id):
+        """generate_pdf keyword arguments for a stored bill, or None."""
+        row = self.conn.execute("SELECT created_at, data FROM bill_records WHERE id = ?", (record_id,)).fetchone()
+        if row is None:
+            return None
+        bill = json.loads(row[1])
+        bill["bill_items"] = [tuple(item) for item in bill.get("bill_items", [])]
+        bill["bill_date"] = datetime.fromisoformat(row[0])
+        return bill
+
+    def query(self, where="", params=()):
+        where = f" WHERE {where}" if where else ""
+        rows = self.conn.execute(
+            f"SELECT path, NULL, customer, contact, created_at, total FROM invoices{where} "
+            f"UNION ALL SELECT NULL, id, customer, contact, created_at, total FROM bill_records{where} "
+            "ORDER BY created_at",
+            tuple(params) * 2
+        )
+        return [
+            ArchivedBill(path, record_id, customer, contact, datetime.fromisoformat(created_at), total)
+            for path, record_id, customer, contact, created_at, total in rows
+        ]
+
+    # ------------------ LOOKUPS ------------------
+
+    def for_customer(self, customer):
+        """Invoices for a customer name (case-insensitive), oldest first."""
+        return self.query("customer_key = ?", (customer.strip().lower(),))
+
+    def for_contact(self, contact):
+        return self.query("contact = ?", (contact.strip(),))
+
+    def between(self, start, end):
+        """Invoices dated from start to end (dates or datetimes, inclusive)."""
+        start = datetime.combine(start, datetime.min.time()) if not isinstance(start, datetime) else start
+        if not isinstance(end, datetime):
+            end = datetime.combine(end, datetime.min.time()) + timedelta(days=1) - timedelta(seconds=1)
+        return self.query(
+            "created_at BETWEEN ? AND ?",
+            (start.isoformat(timespec="seconds"), end.isoformat(timespec="seconds"))
+        )
+
+    def on_date(self, day):
+        return self.between(day, day)
+
+    def __len__(self):
+        return (
+            self.conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0]
+            + self.conn.execute("SELECT COUNT(*) FROM bill_records").fetchone()[0]
+        )
+
+    # ------------------ REBUILD ------------------
+
+    def scan(self, bills_dir=BILLS_DIR):
+        """Yield (path, customer, created_at) for every bill file under bills_dir."""
+        pending = [bills_dir]
+        while pending:
+            try:
+                entries = os.scandir(pending.pop())
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        pending.append(entry.path)
+                        continue
+                    parsed = parse_bill_filename(entry.name)
+                    if parsed:
+                        yield (os.path.normpath(entry.path),) + parsed
+
+    def rebuild(self, bills_dir=BILLS_DIR):
+        """Re-index the folder: add files missing from the index, drop rows whose file is gone.
+
+        Contact and total are not in the file name, so they are kept from the
+        existing row when there is one and left empty for newly found files.
+        Returns the number of indexed bills.
+        """
+        known = {path for (path,) in self.conn.execute("SELECT path FROM invoices")}
+        found = set()
+        with self.conn:
+            for path, customer, created_at in self.scan(bills_dir):
+                found.add(path)
+                if path not in known:
+                    self.conn.execute(
+                        "INSERT INTO invoices (path, customer, customer_key, created_at) VALUES (?, ?, ?, ?)",
+                        (path, customer, customer.strip().lower(), created_at.isoformat(timespec="seconds"))
+                    )
+            self.conn.executemany("DELETE FROM invoices WHERE path = ?", ((p,) for p in known - found))
+        return len(found)
+
+    def close(self):
+        self.conn.close()
+
+
+_archive = None
+
+
+def get_bill_archive():
+    """Return this process's archive index (worker processes open their own connection)."""
+    global _archive
+    if _archive is None or _archive[0] != os.getpid():
+        _archive = (os.getpid(), BillArchive())
+    return _archive[1]
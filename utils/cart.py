@@ -0,0 +1,106 @@
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal("0.01")
+
+BillTotals = namedtuple("BillTotals", ["subtotal", "discount_amount", "gst_amount", "total"])
+
+
+def to_decimal(value):
+    """Convert a price, percentage or amount to Decimal without float noise."""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value or 0))
+
+
+def to_money(value):
+    return to_decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def compute_totals(subtotal, gst_percent, discount_percent):
+    """The one place bill totals are calculated (screen, PDF, ledger, WhatsApp).
+
+    The discount is taken off the subtotal first and GST is charged on the
+    discounted amount. Every amount is rounded to the paisa.
+    """
+    subtotal = to_money(subtotal)
+    discount_amount = to_money(subtotal * to_decimal(discount_percent) / 100)
+    gst_amount = to_money((subtotal - discount_amount) * to_decimal(gst_percent) / 100)
+    return BillTotals(subtotal, discount_amount, gst_amount, subtotal - discount_amount + gst_amount)
+
+
+class CartLine:
+    __slots__ = ("product_id", "name", "price", "quantity", "total")
+
+    def __init__(self, product_id, name, price, quantity):
+        self.product_id = product_id
+        self.name = name
+        self.price = to_money(price)
+        self.set_quantity(quantity)
+
+    def set_quantity(self, quantity):
+        self.quantity = quantity
+        self.total = to_money(self.price * quantity)
+
+    def as_item(self):
+        """(name, quantity, price, total) with float amounts, as generate_pdf expects."""
+        return (self.name, self.quantity, float(self.price), float(self.total))
+
+
+class Cart:
+    """Bill lines keyed by product id, with a running subtotal.
+
+    Adding a product that is already in the cart bumps its quantity instead
+    of adding a second line. Adding, changing a quantity and removing are
+    dict operations, and the subtotal is adjusted by the difference rather
+    than re-summed. Lines keep the order in which products were first added.
+    """
+
+    def __init__(self):
+        self.lines = {}
+        self.subtotal = Decimal("0.00")
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines.values())
+
+    def __contains__(self, product_id):
+        return product_id in self.lines
+
+    def get(self, product_id):
+        return self.lines.get(product_id)
+
+    def add(self, product_id, name, price, quantity):
+        """Add ``quantity`` of a product. Returns (line, is_new_line)."""
+        line = self.lines.get(product_id)
+        if line is None:
+            line = CartLine(product_id, name, price, quantity)
+            self.lines[product_id] = line
+            self.subtotal += line.total
+            return line, True
+        self.set_quantity(product_id, line.quantity + quantity)
+        return line, False
+
+    def set_quantity(self, product_id, quantity):
+        line = self.lines[product_id]
+        self.subtotal -= line.total
+        line.set_quantity(quantity)
+        self.subtotal += line.total
+        return line
+
+    def remove(self, product_id):
+        line = self.lines.pop(product_id)
+        self.subtotal -= line.total
+        return line
+
+    def clear(self):
+        self.lines.clear()
+        self.subtotal = Decimal("0.00")
+
+    def totals(self, gst_percent, discount_percent):
+        return compute_totals(self.subtotal, gst_percent, discount_percent)
+
+    def items(self):
+        return [line.as_item() for line in self.lines.values()]
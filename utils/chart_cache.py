@@ -0,0 +1,83 @@
+import io
+import os
+from collections import OrderedDict
+from PIL import Image, ImageTk
+
+CHART_CACHE_DIR = "data/chart_cache"
+MEMORY_ENTRIES = 16  # decoded images kept in memory
+DISK_ENTRIES = 200  # PNG files kept on disk
+
+
+class ChartCache:
+    """Rendered charts keyed by (chart, product data version, size).
+
+    Decoded PhotoImages sit in a small in-memory LRU; the PNG bytes are also
+    written to ``folder`` (pass None to disable) so charts survive a restart.
+    Because the key contains the repository's data_version, any product
+    change makes old entries unreachable; stale files age out of the disk
+    cache, which keeps only the DISK_ENTRIES most recently used.
+    Must be used from the Tk thread (it creates PhotoImages).
+    """
+
+    def __init__(self, folder=CHART_CACHE_DIR, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES):
+        self.folder = folder
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.images = OrderedDict()
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    @staticmethod
+    def key(chart, data_version, width, height):
+        return f"{chart}-{data_version}-{width}x{height}"
+
+    def path_for(self, key):
+        return os.path.join(self.folder, f"{key}.png")
+
+    def get(self, key):
+        """Cached PhotoImage for key, or None."""
+        image = self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+            return image
+        if not self.folder:
+            return None
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                png = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return self.remember(key, png)
+
+    def put(self, key, png):
+        """Store rendered PNG bytes and return the decoded PhotoImage."""
+        if self.folder:
+            path = self.path_for(key)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png)
+            os.replace(tmp_path, path)
+            self.prune()
+        return self.remember(key, png)
+
+    def remember(self, key, png):
+        image = ImageTk.PhotoImage(Image.open(io.BytesIO(png)))
+        self.images[key] = image
+        self.images.move_to_end(key)
+        while len(self.images) > self.memory_entries:
+            self.images.popitem(last=False)
+        return image
+
+    def prune(self):
+        with os.scandir(self.folder) as entries:
+            files = [(e.stat().st_mtime, e.path) for e in entries if e.name.endswith(".png")]
+        if len(files) <= self.disk_entries:
+            return
+        files.sort()
+        for _, path in files[:len(files) - self.disk_entries]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
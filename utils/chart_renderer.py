@@ -0,0 +1,51 @@
+from concurrent.futures import ProcessPoolExecutor
+from utils.tk_results import TkResultQueue
+
+POLL_MS = 50
+CHART_WIDTH = 900
+CHART_HEIGHT = 400
+
+
+def render_figure(spec, width=CHART_WIDTH, height=CHART_HEIGHT, scale=1):
+    """Worker entry point: rasterize a figure dict to PNG bytes."""
+    # Imported in the worker so the Tk process never starts Kaleido itself
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    return pio.to_image(go.Figure(spec), format="png", width=width, height=height, scale=scale)
+
+
+def warm_up():
+    """Render a tiny figure so Kaleido's browser process is running before the first real chart."""
+    render_figure({"data": [{"type": "bar", "x": [0], "y": [0]}]}, width=10, height=10)
+
+
+class ChartRenderer:
+    """Rasterizes Plotly figures in one long-lived worker process.
+
+    Kaleido starts a headless browser on its first export and reuses it
+    afterwards, so keeping a single worker process alive (and warming it up
+    as soon as the page is built) makes every render after the first one
+    fast, and none of them run on the Tk thread. Figures go to the worker as
+    plain dicts; ``callback(future)`` runs on the Tk thread. A new request
+    cancels an older one that hasn't started yet, since only the latest
+    chart is shown.
+    """
+
+    def __init__(self, widget):
+        self.executor = ProcessPoolExecutor(max_workers=1)
+        self.executor.submit(warm_up)
+        self.results = TkResultQueue(widget, POLL_MS)
+        self.latest = None
+
+    def submit(self, fig, callback, width=CHART_WIDTH, height=CHART_HEIGHT):
+        if self.latest is not None:
+            self.latest.cancel()  # no-op if it is already rendering
+        future = self.executor.submit(render_figure, fig.to_dict(), width, height)
+        self.latest = future
+        self.results.expect()
+        # A cancelled render still has to be counted off, but nobody is waiting for it
+        future.add_done_callback(lambda f: self.results.put(None if f.cancelled() else callback, f))
+        return future
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,71 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, timedelta
+
+
+class DateIndex:
+    """Products kept sorted by purchase date so any range query is a bisect plus a slice.
+
+    Records without a purchase date are not indexed.
+    """
+
+    def __init__(self, records=()):
+        self.rebuild(records)
+
+    def rebuild(self, records):
+        self.records = {r.id: r for r in records if r.purchase_date}
+        self.keys = sorted((r.purchase_date.toordinal(), r.id) for r in self.records.values())
+
+    def add(self, record):
+        if record.purchase_date:
+            insort(self.keys, (record.purchase_date.toordinal(), record.id))
+            self.records[record.id] = record
+
+    def remove(self, record):
+        if record.purchase_date and record.id in self.records:
+            key = (record.purchase_date.toordinal(), record.id)
+            pos = bisect_left(self.keys, key)
+            if pos < len(self.keys) and self.keys[pos] == key:
+                del self.keys[pos]
+            del self.records[record.id]
+
+    def range(self, start=None, end=None):
+        """Return records dated within [start, end], oldest first. Either bound may be None."""
+        lo = bisect_left(self.keys, (start.toordinal(),)) if start else 0
+        hi = bisect_right(self.keys, (end.toordinal(), float("inf"))) if end else len(self.keys)
+        return [self.records[product_id] for _, product_id in self.keys[lo:hi]]
+
+
+def quarter_start(day):
+    return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+
+
+def month_end(day):
+    next_month = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return next_month - timedelta(days=1)
+
+
+def period_range(choice, today):
+    """Return the (start, end) dates for a named period such as "Last 7 Days" or "This Quarter"."""
+    if choice == "Today":
+        return today, today
+    if choice == "Yesterday":
+        yesterday = today - timedelta(days=1)
+        return yesterday, yesterday
+    if choice == "Last 7 Days":
+        return today - timedelta(days=7), today
+    if choice == "Last 30 Days":
+        return today - timedelta(days=30), today
+    if choice == "This Month":
+        return today.replace(day=1), month_end(today)
+    if choice == "Last Month":
+        last_month_end = today.replace(day=1) - timedelta(days=1)
+        return last_month_end.replace(day=1), last_month_end
+    if choice == "This Quarter":
+        start = quarter_start(today)
+        return start, month_end(date(start.year, start.month + 2, 1))
+    if choice == "Last Quarter":
+        end = quarter_start(today) - timedelta(days=1)
+        return quarter_start(end), end
+    if choice == "This Year":
+        return date(today.year, 1, 1), date(today.year, 12, 31)
+    raise ValueError(f"Unknown period: {choice}")
@@ -25,3 +25,85 @@ def load_json_data(filepath):
             return json.load(file)
     else:
         return []
+
+def iter_json_array(filepath, chunk_size=64 * 1024):
+    """Yield the items of a top-level JSON array one at a time.
+
+    The file is read in chunks of ``chunk_size`` characters, so memory use is
+    bounded by the largest single item rather than the size of the file.
+    Yields nothing if the file does not exist.
+    """
+    if not os.path.exists(filepath):
+        return
+
+    decoder = json.JSONDecoder()
+    with open(filepath, 'r') as file:
+        buffer = ""
+        pos = 0
+        eof = False
+        started = False
+
+        while True:
+            # Skip whitespace and separators between items
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+
+            if pos == len(buffer):
+                if eof:
+                    if started:
+                        raise ValueError(f"{filepath}: unexpected end of JSON array")
+                    return
+                data = file.read(chunk_size)
+                eof = len(data) < chunk_size
+                buffer, pos = data, 0
+                continue
+
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{filepath}: expected a JSON array")
+                started = True
+                pos += 1
+                continue
+
+            if buffer[pos] == "]":
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                end = None
+            if end is None or (end == len(buffer) and not eof):
+                # Item straddles the chunk boundary: read more and retry
+                if eof:
+                    raise ValueError(f"{filepath}: invalid JSON near offset {pos}")
+                data = file.read(chunk_size)
+                eof = len(data) < chunk_size
+                buffer, pos = buffer[pos:] + data, 0
+                continue
+
+            pos = end
+            yield item
+
+def iter_json_chunks(filepath, size=1000):
+    """Yield lists of up to ``size`` items from a top-level JSON array."""
+    chunk = []
+    for item in iter_json_array(filepath):
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def write_json_array(filepath, items):
+    """Stream an iterable of items to a JSON array file, written atomically."""
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, 'w') as file:
+        file.write("[")
+        first = True
+        for item in items:
+            file.write("\n    " if first else ",\n    ")
+            file.write(json.dumps(item, indent=4).replace("\n", "\n    "))
+            first = False
+        file.write("\n]" if not first else "]")
+    os.replace(tmp_path, filepath)
@@ -0,0 +1,64 @@
+class GroupTotals:
+    """Running totals for one category.
+
+    Stock value is kept in integer paise so repeated add/remove deltas never
+    drift.
+    """
+
+    __slots__ = ("count", "stock", "value_paise")
+
+    def __init__(self):
+        self.count = 0
+        self.stock = 0
+        self.value_paise = 0
+
+    @property
+    def value(self):
+        return self.value_paise / 100
+
+    def add(self, contribution, sign=1):
+        stock, value_paise = contribution
+        self.count += sign
+        self.stock += sign * stock
+        self.value_paise += sign * value_paise
+
+
+class InventoryAggregates:
+    """Materialized overall and per-category inventory totals.
+
+    Maintained by ProductRepository next to its other indexes: every add,
+    update and delete applies the record's contribution (or removes the old
+    one) in O(1), so the totals never need a full pass outside ``reload``.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.overall = GroupTotals()
+        self.by_category = {}
+
+    @staticmethod
+    def contribution(record):
+        return record.stock, round(record.price * 100) * record.stock
+
+    def apply(self, record, sign):
+        contribution = self.contribution(record)
+        self.overall.add(contribution, sign)
+        totals = self.by_category.get(record.category)
+        if totals is None:
+            totals = self.by_category[record.category] = GroupTotals()
+        totals.add(contribution, sign)
+        if totals.count == 0:
+            del self.by_category[record.category]
+
+    def add(self, record):
+        self.apply(record, 1)
+
+    def remove(self, record):
+        self.apply(record, -1)
+
+    def rebuild(self, records):
+        self.clear()
+        for record in records:
+            self.add(record)
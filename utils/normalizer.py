@@ -0,0 +1,93 @@
+from datetime import datetime
+
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d")
+EMPTY_VALUES = ("", "none", "n/a", "na", "-")
+
+
+def is_empty(value):
+    return value is None or str(value).strip().lower() in EMPTY_VALUES
+
+
+def parse_date(value):
+    """Parse any of the date spellings found in the data (07-08-2025, 11-8-2025, 2025-08-11)."""
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date {text!r}")
+
+
+def parse_float(value):
+    return float(str(value).strip())
+
+
+def parse_int(value):
+    number = float(str(value).strip())
+    if not number.is_integer():
+        raise ValueError(f"{value!r} is not a whole number")
+    return int(number)
+
+
+# field -> (typed attribute name, parser, value when empty or invalid)
+TYPED_FIELDS = {
+    "price": ("price", parse_float, 0.0),
+    "stock": ("stock", parse_int, 0),
+    "date": ("purchase_date", parse_date, None),
+    "expiry": ("expiry_date", parse_date, None),
+    "discount": ("discount_pct", parse_float, None),
+}
+REQUIRED_FIELDS = ("price", "stock")
+
+
+def normalize_fields(fields):
+    """Parse the typed fields of a raw product once.
+
+    Returns ``(typed, issues)`` where typed maps attribute names from
+    TYPED_FIELDS to parsed values and issues is a tuple of
+    ``(field, raw_value, message)`` for every value that could not be parsed.
+    """
+    typed = {}
+    issues = []
+    for field, (attr, parser, fallback) in TYPED_FIELDS.items():
+        raw = fields.get(field, "")
+        if is_empty(raw):
+            typed[attr] = fallback
+            if field in REQUIRED_FIELDS:
+                issues.append((field, raw, "missing value"))
+            continue
+        try:
+            typed[attr] = parser(raw)
+        except (TypeError, ValueError) as e:
+            typed[attr] = fallback
+            issues.append((field, raw, str(e)))
+    return typed, tuple(issues)
+
+
+class ValidationReport:
+    """Bad values found while ingesting products, kept per product id."""
+
+    def __init__(self):
+        self.issues = {}
+
+    def record(self, product_id, name, issues):
+        if issues:
+            self.issues[product_id] = (name, issues)
+        else:
+            self.issues.pop(product_id, None)
+
+    def discard(self, product_id):
+        self.issues.pop(product_id, None)
+
+    def clear(self):
+        self.issues.clear()
+
+    def __len__(self):
+        return len(self.issues)
+
+    def rows(self):
+        """Yield ``(product_id, name, field, raw_value, message)`` for every issue."""
+        for product_id, (name, issues) in self.issues.items():
+            for field, raw, message in issues:
+                yield product_id, name, field, raw, message
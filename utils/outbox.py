@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import threading
+import time
+import webbrowser
+from collections import namedtuple
+from urllib.parse import quote
+
+OUTBOX_DB = "data/outbox.db"
+SEND_INTERVAL_S = 3.0  # at most one message every 3 s (rate limit)
+BATCH_SIZE = 20  # due messages fetched per database round trip
+MAX_ATTEMPTS = 5
+RETRY_BASE_S = 5.0  # 5 s, 10 s, 20 s, ... between attempts
+
+OutboxStats = namedtuple("OutboxStats", ["pending", "sent", "failed"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT NOT NULL UNIQUE,
+    phone TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_due ON messages(status, next_attempt_at);
+"""
+
+
+class BrowserTransport:
+    """Opens a WhatsApp Web deep link with the message pre-filled."""
+
+    def __init__(self, country_code="+91"):
+        self.country_code = country_code
+
+    def send(self, phone, body):
+        url = f"https://web.whatsapp.com/send?phone={self.country_code}{phone}&text={quote(body)}"
+        if not webbrowser.open(url):
+            raise RuntimeError("No web browser available")
+
+
+class FakeTransport:
+    """Records messages instead of sending them, for testing outbox throughput.
+
+    ``latency`` seconds are spent per send, and every ``fail_every``-th send
+    raises, to exercise the retry path.
+    """
+
+    def __init__(self, latency=0.0, fail_every=0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = 0
+        self.sent = []
+
+    def send(self, phone, body):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise RuntimeError("Simulated transport failure")
+        self.sent.append((phone, body))
+
+
+class Outbox:
+    """Persistent queue of outbound messages drained by a background sender.
+
+    ``enqueue`` writes the message to SQLite and returns immediately, so
+    billing never waits on the transport. The sender thread sends due
+    messages at most once per ``send_interval`` seconds and retries failures
+    with exponential backoff up to MAX_ATTEMPTS. Each message has a
+    ``dedup_key`` (e.g. the bill's PDF path and phone number); enqueueing the
+    same key twice is a no-op, so double clicks don't send duplicates.
+    Unsent messages survive a restart and are picked up again.
+    """
+
+    def __init__(self, db_path=OUTBOX_DB, transport=None, send_interval=SEND_INTERVAL_S):
+        self.db_path = db_path
+        self.transport = transport or BrowserTransport()
+        self.send_interval = send_interval
+        folder = os.path.dirname(db_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self.wakeup = threading.Event()  # set when a message is queued
+        self.stopping = threading.Event()
+        self.sender = threading.Thread(target=self.run, daemon=True)
+        self.sender.start()
+
+    def enqueue(self, phone, body, dedup_key):
+        """Queue a message. Returns False if a message with this key was already queued."""
+        now = time.time()
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT OR IGNORE INTO messages (dedup_key, phone, body, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (dedup_key, phone, body, now, now)
+            )
+        if cur.rowcount:
+            self.wakeup.set()
+        return bool(cur.rowcount)
+
+    def stats(self):
+        counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM messages GROUP BY status"))
+        return OutboxStats(counts.get("pending", 0), counts.get("sent", 0), counts.get("failed", 0))
+
+    def retry_failed(self):
+        """Give messages that ran out of attempts another round."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE messages SET status = 'pending', attempts = 0, next_attempt_at = ? WHERE status = 'failed'",
+                (time.time(),)
+            )
+        self.wakeup.set()
+
+    def close(self):
+        self.stopping.set()
+        self.wakeup.set()
+        self.sender.join()
+        self.conn.close()
+
+    # ------------------ SENDER THREAD ------------------
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path)
+        last_send = 0.0
+        while not self.stopping.is_set():
+            self.wakeup.clear()
+            now = time.time()
+            batch = conn.execute(
+                "SELECT id, phone, body, attempts FROM messages "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (now, BATCH_SIZE)
+            ).fetchall()
+
+            for message_id, phone, body, attempts in batch:
+                wait = last_send + self.send_interval - time.monotonic()
+                if self.stopping.wait(max(0.0, wait)):
+                    break
+                last_send = time.monotonic()
+                try:
+                    self.transport.send(phone, body)
+                except Exception as e:
+                    attempts += 1
+                    status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+                    with conn:
+                        conn.execute(
+                            "UPDATE messages SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                            (status, attempts, time.time() + RETRY_BASE_S * 2 ** (attempts - 1), str(e), message_id)
+                        )
+                    continue
+                with conn:
+                    conn.execute(
+                        "UPDATE messages SET status = 'sent', attempts = ?, sent_at = ? WHERE id = ?",
+                        (attempts + 1, time.time(), message_id)
+                    )
+
+            if len(batch) == BATCH_SIZE:
+                continue  # more may be due right away
+            # Sleep until the next retry is due or a new message is queued
+            row = conn.execute("SELECT MIN(next_attempt_at) FROM messages WHERE status = 'pending'").fetchone()
+            timeout = None if row[0] is None else max(0.0, row[0] - time.time())
+            self.wakeup.wait(timeout)
+        conn.close()
@@ -0,0 +1,80 @@
+import os
+from utils.bill_archive import get_bill_archive
+
+PDF_CACHE_DIR = "data/pdf_cache"
+PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+class PdfCache:
+    """Size-bounded, least-recently-used disk cache of rendered bill records.
+
+    A cached PDF is ``<folder>/bill_<record_id>.pdf``; its mtime is bumped on
+    every hit, so eviction removes the files with the oldest mtime until the
+    folder fits in ``max_bytes``. All state is on disk, which lets the app and
+    the PDF worker processes share one cache.
+    """
+
+    def __init__(self, folder=PDF_CACHE_DIR, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        os.makedirs(folder, exist_ok=True)
+
+    def path_for(self, record_id):
+        return os.path.join(self.folder, f"bill_{record_id}.pdf")
+
+    def get(self, record_id):
+        """Path of the cached PDF, or None if it has to be rendered."""
+        path = self.path_for(record_id)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def render(self, record_id, bill):
+        """Render a bill record into the cache and return the PDF path."""
+        # Imported here so the cache can be inspected without loading reportlab
+        from utils.pdf_generator import generate_pdf
+        path = self.path_for(record_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        generate_pdf(filepath=tmp_path, archive=False, **bill)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        entries = []
+        total = 0
+        with os.scandir(self.folder) as files:
+            for entry in files:
+                if entry.name.endswith(".pdf"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+                    total += stat.st_size
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # evicted by another process
+            total -= size
+
+
+def render_bill_record(record_id):
+    """Return a PDF for a stored bill record, rendering it only on a cache miss.
+
+    Used for PDF exports and WhatsApp sharing when BILL_STORAGE is "record";
+    safe to run in a PDF worker process.
+    """
+    cache = PdfCache()
+    path = cache.get(record_id)
+    if path:
+        return path
+    bill = get_bill_archive().get_record(record_id)
+    if bill is None:
+        raise KeyError(f"No stored bill with id {record_id}")
+    return cache.render(record_id, bill)
@@ -1,14 +1,126 @@
 import os
+import sqlite3
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer, Image
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 from reportlab.pdfbase import pdfmetrics
-
-# Register a Unicode font for ₹ symbol
-pdfmetrics.registerFont(UnicodeCIDFont('HeiseiMin-W3'))
+from utils.bill_archive import get_bill_archive, shard_folder
+from utils.cart import compute_totals, to_decimal
+
+BillResult = namedtuple("BillResult", ["index", "path", "error"])
+
+_fonts_registered = False
+
+
+def register_fonts():
+    """Register the Unicode font for the ₹ symbol on first use rather than at import."""
+    global _fonts_registered
+    if not _fonts_registered:
+        pdfmetrics.registerFont(UnicodeCIDFont('HeiseiMin-W3'))
+        _fonts_registered = True
+
+
+class InvoiceTemplate:
+    """The parts of an invoice that only depend on the shop.
+
+    Styles, the table style and the header flowables (logo, shop name,
+    address, phone) are prepared once and reused for every invoice, so
+    rendering a bill only builds the customer block and the line-item table.
+    Get instances through get_invoice_template() so they are shared.
+    """
+
+    def __init__(self, shop_name, shop_address, shop_phone, shop_pin, logo_path):
+        register_fonts()
+        self.styles = getSampleStyleSheet()
+        self.table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+
+            ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), 'HeiseiMin-W3'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.black),
+        ])
+
+        self.header = []
+        # Shop logo
+        if os.path.exists(logo_path):
+            self.header.append(Image(logo_path, width=60, height=60))
+        # Shop details
+        self.header.append(Paragraph(f"<b>{shop_name}</b>", self.styles['Title']))
+        self.header.append(Paragraph(f"{shop_address}", self.styles['Normal']))
+        self.header.append(Paragraph(f"Phone: {shop_phone} | PIN: {shop_pin}", self.styles['Normal']))
+        self.header.append(Spacer(1, 12))
+        self.footer = [
+            Spacer(1, 24),
+            Paragraph("<i>Thank you for shopping with us!</i>", self.styles['Normal'])
+        ]
+
+    def build_elements(self, customer_name, customer_contact, bill_items, gst_percent, discount_percent, bill_date):
+        styles = self.styles
+        elements = list(self.header)
+
+        # Customer Info
+        elements.append(Paragraph(f"<b>Customer Name:</b> {customer_name}", styles['Normal']))
+        elements.append(Paragraph(f"<b>Contact:</b> {customer_contact}", styles['Normal']))
+        elements.append(Paragraph(f"<b>Date:</b> {bill_date.strftime('%d-%m-%Y %H:%M:%S')}", styles['Normal']))
+        elements.append(Spacer(1, 12))
+
+        # Table headers
+        data = [["Product", "Quantity", "Price (Rs)", "Total (Rs)"]]
+        total_amount = 0
+
+        for item in bill_items:
+            name, qty, price, total = item
+            data.append([name, str(qty), f"{price:.2f}", f"{total:.2f}"])
+            total_amount += to_decimal(total)
+
+        # Discount, then GST on the discounted amount
+        totals = compute_totals(total_amount, gst_percent, discount_percent)
+
+        # Add totals to table
+        data.append(["", "", "Subtotal", f"{totals.subtotal:.2f}"])
+        if discount_percent > 0:
+            data.append(["", "", f"Discount ({discount_percent}%)", f"- {totals.discount_amount:.2f}"])
+        data.append(["", "", f"GST ({gst_percent}%)", f"{totals.gst_amount:.2f}"])
+        data.append(["", "", "Total", f"Rs{totals.total:.2f}"])
+
+        # Table styling
+        table = Table(data, colWidths=[200, 100, 100, 100])
+        table.setStyle(self.table_style)
+
+        elements.append(table)
+        elements.extend(self.footer)
+        return elements, totals
+
+
+@lru_cache(maxsize=8)
+def get_invoice_template(shop_name, shop_address, shop_phone, shop_pin, logo_path):
+    return InvoiceTemplate(shop_name, shop_address, shop_phone, shop_pin, logo_path)
+
+
+def claim_bill_path(output_folder, customer_name, when):
+    """Reserve a unique <customer>_<timestamp>.pdf path, safe across worker processes."""
+    now = when.strftime("%d-%m-%Y_%H-%M-%S")
+    base = f"{customer_name.replace(' ', '_')}_{now}"
+    suffix = ""
+    counter = 1
+    while True:
+        filepath = os.path.join(output_folder, f"{base}{suffix}.pdf")
+        try:
+            os.close(os.open(filepath, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return filepath
+        except FileExistsError:
+            counter += 1
+            suffix = f"_{counter}"
 
 def generate_pdf(
     customer_name,
@@ -21,77 +133,86 @@ def generate_pdf(
     shop_address="123 Main Street, Pune, Maharashtra",
     shop_phone="+91-9876543210",
     shop_pin="411001",
-    output_folder="bills"
+    output_folder="bills",
+    bill_date=None,
+    archive=True,
+    filepath=None
 ):
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    now = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
-    filename = f"{customer_name.replace(' ', '_')}_{now}.pdf"
-    filepath = os.path.join(output_folder, filename)
+    # bill_date (a datetime) lets reprints keep the original invoice date
+    bill_date = bill_date or datetime.now()
+    if filepath:
+        # Explicit target (e.g. the PDF cache); not an invoice in the bills folder
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    else:
+        folder = shard_folder(output_folder, bill_date)
+        os.makedirs(folder, exist_ok=True)
+        filepath = claim_bill_path(folder, customer_name, bill_date)
 
     doc = SimpleDocTemplate(filepath, pagesize=A4)
-    styles = getSampleStyleSheet()
-    elements = []
-
-    # Shop logo
-    if os.path.exists(logo_path):
-        img = Image(logo_path, width=60, height=60)
-        elements.append(img)
-
-    # Shop details
-    elements.append(Paragraph(f"<b>{shop_name}</b>", styles['Title']))
-    elements.append(Paragraph(f"{shop_address}", styles['Normal']))
-    elements.append(Paragraph(f"Phone: {shop_phone} | PIN: {shop_pin}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    # Customer Info
-    elements.append(Paragraph(f"<b>Customer Name:</b> {customer_name}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Contact:</b> {customer_contact}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Date:</b> {datetime.now().strftime('%d-%m-%Y %H:%M:%S')}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    # Table headers
-    data = [["Product", "Quantity", "Price (Rs)", "Total (Rs)"]]
-    total_amount = 0
-
-    for item in bill_items:
-        name, qty, price, total = item
-        data.append([name, str(qty), f"{price:.2f}", f"{total:.2f}"])
-        total_amount += total
-
-    # GST & Discount
-    gst_amount = total_amount * gst_percent / 100
-    discounted_total = total_amount + gst_amount
-    discount_amount = discounted_total * discount_percent / 100
-    final_amount = discounted_total - discount_amount
-
-    # Add totals to table
-    data.append(["", "", "Subtotal", f"{total_amount:.2f}"])
-    data.append(["", "", f"GST ({gst_percent}%)", f"{gst_amount:.2f}"])
-    if discount_percent > 0:
-        data.append(["", "", f"Discount ({discount_percent}%)", f"- {discount_amount:.2f}"])
-    data.append(["", "", "Total", f"Rs{final_amount:.2f}"])
-
-    # Table styling
-    table = Table(data, colWidths=[200, 100, 100, 100])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-
-        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, -1), 'HeiseiMin-W3'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('GRID', (0, 0), (-1, -1), 0.25, colors.black),
-    ]))
-
-    elements.append(table)
-    elements.append(Spacer(1, 24))
-    elements.append(Paragraph("<i>Thank you for shopping with us!</i>", styles['Normal']))
+    template = get_invoice_template(shop_name, shop_address, shop_phone, shop_pin, logo_path)
+    elements, totals = template.build_elements(
+        customer_name, customer_contact, bill_items, gst_percent, discount_percent, bill_date
+    )
 
     # Generate the PDF
-    doc.build(elements)
+    try:
+        doc.build(elements)
+    except Exception:
+        if os.path.exists(filepath):
+            os.remove(filepath)  # don't leave the claimed placeholder behind
+        raise
+
+    if archive:
+        try:
+            get_bill_archive().record(filepath, customer_name, customer_contact, bill_date, totals.total)
+        except sqlite3.Error:
+            pass  # the PDF is written; BillArchive.rebuild() picks up anything the index missed
 
     return filepath  # Return path so you can use it for WhatsApp etc.
+
+
+def _render_bill(job):
+    """Worker entry point: render one bill and report failure instead of raising."""
+    index, bill, output_folder = job
+    try:
+        return BillResult(index, generate_pdf(output_folder=output_folder, **bill), None)
+    except Exception as e:
+        return BillResult(index, None, f"{type(e).__name__}: {e}")
+
+
+def generate_pdfs_batch(bills, output_folder="bills", workers=None, progress=None):
+    """Render many invoices, e.g. for month-end reprints or end-of-day runs.
+
+    ``bills`` is a sequence of dicts of generate_pdf keyword arguments
+    (customer_name, customer_contact, bill_items, gst_percent, ...). Work is
+    spread over ``workers`` processes (all cores by default; 1 renders
+    in-process). Each worker reuses its cached InvoiceTemplate (styles,
+    fonts, decoded logo) for every bill it renders. ``progress(done, total, result)`` is called as
+    each bill finishes. A failing bill does not stop the batch; its
+    BillResult has ``path=None`` and an ``error`` message.
+
+    Returns a list of BillResult(index, path, error) in input order.
+    """
+    bills = list(bills)
+    jobs = [(index, bill, output_folder) for index, bill in enumerate(bills)]
+    os.makedirs(output_folder, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        outcomes = map(_render_bill, jobs)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        chunksize = max(1, len(jobs) // (workers * 4))
+        outcomes = executor.map(_render_bill, jobs, chunksize=chunksize)
+
+    results = []
+    try:
+        for result in outcomes:
+            results.append(result)
+            if progress:
+                progress(len(results), len(jobs), result)
+    finally:
+        if executor:
+            executor.shutdown()
+    return results
@@ -0,0 +1,37 @@
+from concurrent.futures import ProcessPoolExecutor
+from utils.tk_results import TkResultQueue
+
+POLL_MS = 100
+
+
+class PdfWorkerPool:
+    """Render invoice PDFs in worker processes off the Tk main thread.
+
+    ``submit`` returns a ``concurrent.futures.Future`` immediately;
+    ``callback(future)`` runs on the Tk thread once it is done.
+    """
+
+    def __init__(self, widget, workers=None):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.results = TkResultQueue(widget, POLL_MS)
+
+    def submit(self, callback=None, **pdf_kwargs):
+        """Queue one generate_pdf(**pdf_kwargs) call and return its future."""
+        # Imported here so reportlab is only loaded once the first PDF is requested
+        from utils.pdf_generator import generate_pdf
+        return self.submit_call(generate_pdf, callback, **pdf_kwargs)
+
+    def submit_record(self, record_id, callback=None):
+        """Queue rendering of a stored bill record (served from the PDF cache if possible)."""
+        from utils.pdf_cache import render_bill_record
+        return self.submit_call(render_bill_record, callback, record_id)
+
+    def submit_call(self, fn, callback=None, *args, **kwargs):
+        return self.results.track(self.executor.submit(fn, *args, **kwargs), callback)
+
+    @property
+    def pending(self):
+        return self.results.pending
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+from utils.file_manager import iter_json_array, write_json_array
+from utils.product_store import ProductStore, PRODUCT_FIELDS
+
+COMPACT_THRESHOLD = 1024 * 1024  # bytes of journal before folding into the snapshot
+
+
+class JournalProductStore(ProductStore):
+    """Product store that keeps a JSON snapshot plus an append-only journal.
+
+    Every insert/update/delete appends one small JSON line (op, id, fields) to
+    the journal, so the cost of an edit does not depend on catalog size. Once
+    the journal grows past ``compact_threshold`` bytes a background thread
+    writes a fresh snapshot and drops the journal records it has absorbed.
+
+    Ids are never reused, even for deleted products: every fresh journal
+    starts with a ``next_id`` record carrying the high-water mark, since the
+    snapshot alone can't tell which ids were handed out and deleted.
+    """
+
+    def __init__(self, snapshot_path, journal_path, compact_threshold=COMPACT_THRESHOLD):
+        self.path = snapshot_path
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.frozen_path = journal_path + ".compacting"
+        self.compact_threshold = compact_threshold
+        self.lock = threading.Lock()
+        self.compactor = None
+        self.products = {}
+        self.replay()
+        if os.path.exists(self.frozen_path):
+            # Finish the interrupted compaction before a new one can reuse the frozen path
+            self.compact([dict(p) for p in self.products.values()])
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self.journal = open(self.journal_path, "a")
+            self.append_next_id()
+        else:
+            self.journal = open(self.journal_path, "a")
+
+    # ------------------ LOADING ------------------
+
+    def replay(self):
+        """Rebuild in-memory state from the snapshot and any pending journals."""
+        self.products = {}
+        self.next_id = 1
+        for position, product in enumerate(iter_json_array(self.snapshot_path), start=1):
+            product = dict(product)
+            product.setdefault("id", position)
+            self.products[product["id"]] = product
+
+        # A leftover frozen journal means a compaction was interrupted; its
+        # records are idempotent, so replaying them again is always safe.
+        for path in (self.frozen_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self.apply(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Torn final write from a crash; everything before it is intact
+                        break
+
+        self.next_id = max(self.next_id, max(self.products, default=0) + 1)
+
+    def apply(self, record):
+        op, product_id = record["op"], record["id"]
+        if op == "next_id":
+            self.next_id = max(self.next_id, product_id)
+            return
+        self.next_id = max(self.next_id, product_id + 1)
+        if op == "delete":
+            self.products.pop(product_id, None)
+        else:
+            product = {k: record["fields"].get(k, "") for k in PRODUCT_FIELDS}
+            product["id"] = product_id
+            self.products[product_id] = product
+
+    # ------------------ WRITES ------------------
+
+    def append(self, record):
+        self.journal.write(json.dumps(record) + "\n")
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.apply(record)
+        if self.journal.tell() >= self.compact_threshold:
+            self.start_compaction()
+
+    def insert(self, product):
+        with self.lock:
+            product_id = self.next_id
+            self.next_id += 1
+            self.append({"op": "insert", "id": product_id, "fields": {k: product.get(k, "") for k in PRODUCT_FIELDS}})
+        return product_id
+
+    def update(self, product_id, product):
+        with self.lock:
+            self.append({"op": "update", "id": product_id, "fields": {k: product.get(k, "") for k in PRODUCT_FIELDS}})
+
+    def delete(self, product_id):
+        with self.lock:
+            self.append({"op": "delete", "id": product_id})
+
+    def append_next_id(self):
+        """Carry the id high-water mark into a fresh journal."""
+        self.append({"op": "next_id", "id": self.next_id})
+
+    # ------------------ COMPACTION ------------------
+
+    def start_compaction(self):
+        """Freeze the current journal and fold it into a new snapshot off-thread.
+
+        Must be called with ``self.lock`` held.
+        """
+        if self.compactor and self.compactor.is_alive():
+            return
+        self.journal.close()
+        os.replace(self.journal_path, self.frozen_path)
+        self.journal = open(self.journal_path, "a")
+        self.append_next_id()
+        state = [dict(p) for p in self.products.values()]
+        self.compactor = threading.Thread(target=self.compact, args=(state,), daemon=True)
+        self.compactor.start()
+
+    def compact(self, state):
+        write_json_array(self.snapshot_path, state)
+        os.remove(self.frozen_path)
+
+    # ------------------ READS ------------------
+
+    def all(self):
+        with self.lock:
+            return [dict(p) for p in self.products.values()]
+
+    def get(self, product_id):
+        with self.lock:
+            product = self.products.get(product_id)
+            return dict(product) if product else None
+
+    def data_files(self):
+        return [self.snapshot_path, self.journal_path]
+
+    def close(self):
+        if self.compactor:
+            self.compactor.join()
+        self.journal.close()
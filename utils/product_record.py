@@ -0,0 +1,73 @@
+import hashlib
+import sys
+from utils.product_store import PRODUCT_FIELDS
+from utils.normalizer import normalize_fields, TYPED_FIELDS
+
+# Low-cardinality text columns; equal values share one interned string object
+INTERNED_FIELDS = ("category", "brand", "unit", "customer")
+
+# Parsed values cached on the record next to the raw text they came from
+DERIVED_FIELDS = ("purchase_date", "expiry_date", "discount_pct", "issues")
+
+
+class ProductRecord:
+    """Compact in-memory product with typed price/stock and interned text columns.
+
+    Every field is parsed exactly once, when the record is built: price and
+    stock become numbers, date/expiry become ``datetime.date`` (or None) in
+    ``purchase_date``/``expiry_date``, and values that failed to parse are
+    listed in ``issues`` as ``(field, raw_value, message)``.
+
+    Supports ``record.get(key, default)`` and ``record[key]`` so code written
+    against the old product dicts keeps working; hot paths should read the
+    attributes (``record.price``, ``record.stock``) directly.
+
+    ``version`` is the store's row version (bumped on every write to the
+    row by the SQLite store); it is 0 for backends that don't keep one.
+    """
+
+    __slots__ = ("id", "version") + tuple(PRODUCT_FIELDS) + DERIVED_FIELDS
+
+    def __init__(self, id=None, version=0, **fields):
+        self.id = id
+        self.version = version or 0
+        typed, self.issues = normalize_fields(fields)
+        for attr, _, _ in TYPED_FIELDS.values():
+            setattr(self, attr, typed[attr])
+        for key in PRODUCT_FIELDS:
+            if key in ("price", "stock"):
+                continue
+            value = fields.get(key, "")
+            value = "" if value is None else str(value).strip()
+            if key in INTERNED_FIELDS:
+                value = sys.intern(value)
+            setattr(self, key, value)
+
+    def fingerprint(self):
+        """64-bit content hash (id plus every field), stable across runs."""
+        data = repr((self.id,) + tuple(getattr(self, k) for k in PRODUCT_FIELDS)).encode("utf-8")
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+    def is_valid(self, field):
+        return not any(issue[0] == field for issue in self.issues)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{k: v for k, v in data.items() if k in ("id", "version") or k in PRODUCT_FIELDS})
+
+    def to_dict(self):
+        data = {k: getattr(self, k) for k in PRODUCT_FIELDS}
+        data["id"] = self.id
+        data["version"] = self.version
+        return data
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __repr__(self):
+        return f"ProductRecord(id={self.id!r}, name={self.name!r})"
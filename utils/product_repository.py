@@ -0,0 +1,241 @@
+import os
+from utils.product_record import ProductRecord
+from utils.product_store import PRODUCT_FIELDS
+from utils.normalizer import ValidationReport
+from utils.date_index import DateIndex
+from utils.search_index import ProductSearchIndex
+from utils.inventory_aggregates import InventoryAggregates
+
+
+class ProductRepository:
+    """In-process cache of the product catalog shared by every page.
+
+    The catalog is read from the store once and kept in memory as
+    ProductRecord objects. Mutations go
+    through the repository, which writes the single affected row to the store
+    and then notifies subscribers with a delta so each page can patch its own
+    view. Writes made by other processes are picked up by comparing the
+    store's write counter with ``catalog_version`` (or, for stores without
+    one, the mtime/size of its files); see ``refresh_if_changed``.
+
+    Subscribers are called as ``callback(event, product)`` where event is one
+    of "add", "update", "delete" or "reload" (product is None for reload).
+
+    ``data_version`` identifies the catalog's current content: it is the XOR
+    of every record's fingerprint, so each write updates it in O(1) and equal
+    catalogs get equal versions, even across restarts.
+
+    ``catalog_version`` is the store's write counter as this cache expects it
+    to be: read on reload and advanced by one for every row written since.
+    If the store's counter still equals it, the in-memory state matches the
+    stored data exactly.
+
+    Code that writes rows through another connection (the sales ledger, the
+    API's writer thread) raises ``writes_in_flight`` until it has applied
+    the result here, so the not-yet-applied rows aren't mistaken for a
+    foreign write.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.products = {}
+        self.listeners = []
+        self.signature = None
+        self.catalog_version = None
+        self.writes_in_flight = 0
+        self.content_hash = 0
+        self.validation_report = ValidationReport()
+        self.date_index = DateIndex()
+        self.search_index = ProductSearchIndex()
+        self.aggregates = InventoryAggregates()
+        self.reload()
+
+    # ------------------ CHANGE TRACKING ------------------
+
+    def file_signature(self):
+        signature = []
+        for path in self.store.data_files():
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def reload(self):
+        # Read the counter first: a write landing during the load then shows up as a mismatch
+        self.catalog_version = self.store.catalog_version()
+        self.products = {p["id"]: ProductRecord.from_dict(p) for p in self.store.iter_all()}
+        self.content_hash = 0
+        for record in self.products.values():
+            self.content_hash ^= record.fingerprint()
+        self.validation_report.clear()
+        for record in self.products.values():
+            self.validation_report.record(record.id, record.name, record.issues)
+        self.date_index.rebuild(self.products.values())
+        self.search_index.rebuild(self.products.values())
+        self.signature = self.file_signature()
+        self.aggregates.rebuild(self.products.values())
+        self.publish("reload", None)
+
+    def changed_elsewhere(self):
+        """True if the store holds writes this cache hasn't seen (one cheap query or stat)."""
+        if self.catalog_version is not None:
+            return self.store.catalog_version() != self.catalog_version
+        return self.file_signature() != self.signature
+
+    def refresh_if_changed(self):
+        """Reload from the store if another process wrote to it. Returns True on reload.
+
+        Does nothing while this process has writes in flight; the next call catches up.
+        """
+        if not self.writes_in_flight and self.changed_elsewhere():
+            self.reload()
+            return True
+        return False
+
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def publish(self, event, product):
+        for callback in list(self.listeners):
+            callback(event, product)
+
+    def count_writes(self, rows):
+        if self.catalog_version is not None:
+            self.catalog_version += rows
+
+    # ------------------ READS ------------------
+
+    @property
+    def data_version(self):
+        return f"{self.content_hash:016x}"
+
+    def all(self):
+        return list(self.products.values())
+
+    def get(self, product_id):
+        return self.products.get(product_id)
+
+    def in_date_range(self, start=None, end=None):
+        """Products purchased between start and end (inclusive), oldest first."""
+        return self.date_index.range(start, end)
+
+    def find_by_name(self, name):
+        return self.search_index.get(name)
+
+    def find_by_sku(self, sku):
+        """Product for a scanned barcode/SKU, or None. Constant time."""
+        return self.search_index.get_by_sku(sku)
+
+    def suggest(self, prefix, limit=10):
+        """Product names whose name, name word or brand starts with prefix."""
+        return self.search_index.suggest(prefix, limit)
+
+    # ------------------ WRITES ------------------
+
+    def add(self, product):
+        record = ProductRecord.from_dict(product)
+        record.id = self.store.insert(record.to_dict())
+        self.products[record.id] = record
+        self.content_hash ^= record.fingerprint()
+        self.validation_report.record(record.id, record.name, record.issues)
+        self.date_index.add(record)
+        self.search_index.add(record)
+        self.aggregates.add(record)
+        self.count_writes(1)
+        self.signature = self.file_signature()
+        self.publish("add", record)
+        return record.id
+
+    def update(self, product_id, product):
+        record = ProductRecord.from_dict(product)
+        record.id = product_id
+        self.store.update(product_id, record.to_dict())
+        old = self.products.get(product_id)
+        record.version = old.version + 1 if old else 0  # the store bumped the row's version
+        self.replace(record)
+        self.count_writes(1)
+        self.signature = self.file_signature()
+        self.publish("update", record)
+
+    def update_fields(self, product_id, changes):
+        """Change only the given fields of a product.
+
+        The other columns are left as they are in the store, so e.g. a sale
+        the ledger (or another till) committed after the product form was
+        filled in is not overwritten with the stock the form was showing.
+        """
+        old = self.products[product_id]
+        data = old.to_dict()
+        data.update(changes)
+        record = ProductRecord.from_dict(data)
+        values = record.to_dict()
+        self.store.update_fields(product_id, {k: values[k] for k in PRODUCT_FIELDS if k in changes})
+        record.version = old.version + 1
+        self.replace(record)
+        self.count_writes(1)
+        self.signature = self.file_signature()
+        self.publish("update", record)
+
+    def apply_stock_levels(self, stock):
+        """Adopt stock values already written to the store (e.g. by the sales ledger)."""
+        for product_id, level in stock.items():
+            if product_id not in self.products:
+                continue
+            data = self.products[product_id].to_dict()
+            data["stock"] = level
+            data["version"] += 1  # the ledger's decrement bumped the row's version
+            record = ProductRecord.from_dict(data)
+            self.replace(record)
+            self.publish("update", record)
+        self.count_writes(len(stock))
+        self.signature = self.file_signature()
+
+    def adopt(self, record, written=True):
+        """Take over a row another connection already wrote to the store (e.g. the API's writer).
+
+        Pass written=False for a row someone else changed, so the write isn't counted as ours.
+        """
+        event = "update" if record.id in self.products else "add"
+        self.replace(record)
+        if written:
+            self.count_writes(1)
+        self.signature = self.file_signature()
+        self.publish(event, record)
+
+    def replace(self, record):
+        old = self.products.get(record.id)
+        if old is not None:
+            self.content_hash ^= old.fingerprint()
+            self.date_index.remove(old)
+            self.search_index.remove(old)
+            self.aggregates.remove(old)
+        self.products[record.id] = record
+        self.content_hash ^= record.fingerprint()
+        self.validation_report.record(record.id, record.name, record.issues)
+        self.date_index.add(record)
+        self.search_index.add(record)
+        self.aggregates.add(record)
+
+    def delete(self, product_id):
+        self.store.delete(product_id)
+        self.forget(product_id)
+
+    def forget(self, product_id, written=True):
+        """Drop a product that is already gone from the store (see ``adopt`` for ``written``)."""
+        product = self.products.pop(product_id, None)
+        self.validation_report.discard(product_id)
+        self.signature = self.file_signature()
+        if product is not None:
+            if written:
+                self.count_writes(1)
+            self.content_hash ^= product.fingerprint()
+            self.date_index.remove(product)
+            self.search_index.remove(product)
+            self.aggregates.remove(product)
+            self.publish("delete", product)
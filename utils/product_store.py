@@ -0,0 +1,279 @@
+import os
+import sqlite3
+from utils.file_manager import iter_json_chunks, write_json_array
+
+PRODUCTS_FILE = "data/products.json"
+PRODUCTS_DB = "data/products.db"
+PRODUCTS_JOURNAL = "data/products.journal"
+STORE_BACKEND = "sqlite"  # "sqlite" or "journal"
+
+PRODUCT_FIELDS = [
+    "name", "category", "brand", "unit", "price", "stock",
+    "customer", "date", "sku", "expiry", "discount", "notes"
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    brand TEXT NOT NULL DEFAULT '',
+    unit TEXT NOT NULL DEFAULT '',
+    price REAL NOT NULL DEFAULT 0,
+    stock INTEGER NOT NULL DEFAULT 0,
+    customer TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT '',
+    sku TEXT NOT NULL DEFAULT '',
+    expiry TEXT NOT NULL DEFAULT '',
+    discount TEXT NOT NULL DEFAULT '',
+    notes TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);
+CREATE INDEX IF NOT EXISTS idx_products_sku ON products(sku);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('catalog_version', 0);
+CREATE TRIGGER IF NOT EXISTS products_insert_version AFTER INSERT ON products BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'catalog_version';
+END;
+CREATE TRIGGER IF NOT EXISTS products_update_version AFTER UPDATE ON products BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'catalog_version';
+END;
+CREATE TRIGGER IF NOT EXISTS products_delete_version AFTER DELETE ON products BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'catalog_version';
+END;
+"""
+
+
+def _row_values(product):
+    """Return the column values of a product dict in PRODUCT_FIELDS order."""
+    return tuple(product.get(k, "") for k in PRODUCT_FIELDS)
+
+
+# Row-level writes shared by the store and by other connections to the same
+# database (the API's writer thread). Each statement bumps the row's
+# ``version``, so ``expected_version`` turns an update or delete into a
+# compare-and-set: it only applies if nobody changed the row since.
+
+def insert_product(conn, product):
+    columns = ", ".join(PRODUCT_FIELDS)
+    placeholders = ", ".join("?" for _ in PRODUCT_FIELDS)
+    cur = conn.execute(f"INSERT INTO products ({columns}) VALUES ({placeholders})", _row_values(product))
+    return cur.lastrowid
+
+
+def update_product(conn, product_id, changes, expected_version=None):
+    """Set the given fields of one product; returns False if no row matched."""
+    fields = [k for k in PRODUCT_FIELDS if k in changes]
+    assignments = "".join(f"{k} = ?, " for k in fields)
+    sql = f"UPDATE products SET {assignments}version = version + 1 WHERE id = ?"
+    params = [changes[k] for k in fields] + [product_id]
+    if expected_version is not None:
+        sql += " AND version = ?"
+        params.append(expected_version)
+    return conn.execute(sql, params).rowcount > 0
+
+
+def delete_product(conn, product_id, expected_version=None):
+    sql = "DELETE FROM products WHERE id = ?"
+    params = [product_id]
+    if expected_version is not None:
+        sql += " AND version = ?"
+        params.append(expected_version)
+    return conn.execute(sql, params).rowcount > 0
+
+
+def read_product(conn, product_id):
+    """One product row as a dict, whatever the connection's row_factory."""
+    cur = conn.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip((column[0] for column in cur.description), row))
+
+
+class ProductStore:
+    """Interface shared by all product storage backends.
+
+    Products are plain dicts keyed by PRODUCT_FIELDS plus a stable integer "id".
+    """
+
+    def all(self):
+        raise NotImplementedError
+
+    def iter_all(self):
+        """Yield products one at a time; backends override this to avoid building a list."""
+        return iter(self.all())
+
+    def get(self, product_id):
+        raise NotImplementedError
+
+    def insert(self, product):
+        """Insert a product and return its new id."""
+        raise NotImplementedError
+
+    def update(self, product_id, product):
+        raise NotImplementedError
+
+    def update_fields(self, product_id, changes):
+        """Write only the given fields of one product; the rest keep their stored values."""
+        product = self.get(product_id)
+        if product is not None:
+            product.update(changes)
+            self.update(product_id, product)
+
+    def delete(self, product_id):
+        raise NotImplementedError
+
+    def find_by_name(self, name):
+        return [p for p in self.all() if p.get("name") == name]
+
+    def find_by_sku(self, sku):
+        return next((p for p in self.all() if p.get("sku") == sku), None)
+
+    def find_by_category(self, category):
+        return [p for p in self.all() if p.get("category") == category]
+
+    def data_files(self):
+        """Paths whose mtime/size change whenever the stored catalog changes."""
+        return [self.path]
+
+    def catalog_version(self):
+        """Counter that goes up by one per product row written, kept with the data
+        itself; None if the backend doesn't keep one."""
+        return None
+
+    def export_json(self, filepath):
+        """Stream the whole catalog (without ids) to a JSON file."""
+        write_json_array(filepath, ({k: p.get(k, "") for k in PRODUCT_FIELDS} for p in self.iter_all()))
+
+    def close(self):
+        pass
+
+
+class SQLiteProductStore(ProductStore):
+    """Product store backed by an indexed SQLite table with per-row writes."""
+
+    def __init__(self, db_path=PRODUCTS_DB, json_path=PRODUCTS_FILE):
+        self.path = db_path
+        folder = os.path.dirname(db_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.upgrade_schema()
+        self.migrate_from_json(json_path)
+
+    def upgrade_schema(self):
+        """Add columns introduced after a database was created."""
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(products)")}
+        if "version" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE products ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def migrate_from_json(self, json_path):
+        """One-time import of the legacy products.json.
+
+        Done once per database, recorded in the meta table, so a catalog the
+        user has emptied stays empty. Databases created before the flag
+        existed count as migrated if they already hold products.
+        """
+        if self.get_meta("json_migrated"):
+            return 0
+        if not json_path or not os.path.exists(json_path) or \
+                self.conn.execute("SELECT 1 FROM products LIMIT 1").fetchone():
+            with self.conn:
+                self.set_meta("json_migrated", 1)
+            return 0
+        columns = ", ".join(PRODUCT_FIELDS)
+        placeholders = ", ".join("?" for _ in PRODUCT_FIELDS)
+        count = 0
+        # Stream the file in bounded chunks so huge exports never sit in memory at once
+        with self.conn:
+            for chunk in iter_json_chunks(json_path):
+                self.conn.executemany(
+                    f"INSERT INTO products ({columns}) VALUES ({placeholders})",
+                    (_row_values(p) for p in chunk if isinstance(p, dict))
+                )
+                count += len(chunk)
+            self.set_meta("json_migrated", 1)
+        return count
+
+    def all(self):
+        return [dict(row) for row in self.conn.execute("SELECT * FROM products ORDER BY id")]
+
+    def iter_all(self):
+        for row in self.conn.execute("SELECT * FROM products ORDER BY id"):
+            yield dict(row)
+
+    def get(self, product_id):
+        row = self.conn.execute("SELECT * FROM products WHERE id = ?", (product_id,)).fetchone()
+        return dict(row) if row else None
+
+    def insert(self, product):
+        with self.conn:
+            return insert_product(self.conn, product)
+
+    def update(self, product_id, product):
+        with self.conn:
+            update_product(self.conn, product_id, {k: product.get(k, "") for k in PRODUCT_FIELDS})
+
+    def update_fields(self, product_id, changes):
+        with self.conn:
+            update_product(self.conn, product_id, changes)
+
+    def delete(self, product_id):
+        with self.conn:
+            delete_product(self.conn, product_id)
+
+    def find_by_name(self, name):
+        rows = self.conn.execute("SELECT * FROM products WHERE name = ? ORDER BY id", (name,))
+        return [dict(row) for row in rows]
+
+    def find_by_sku(self, sku):
+        row = self.conn.execute("SELECT * FROM products WHERE sku = ? LIMIT 1", (sku,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_category(self, category):
+        rows = self.conn.execute("SELECT * FROM products WHERE category = ? ORDER BY id", (category,))
+        return [dict(row) for row in rows]
+
+    def data_files(self):
+        return [self.path, self.path + "-wal"]
+
+    def catalog_version(self):
+        # Maintained by triggers, so writes from any connection (the ledger, the API) count
+        return int(self.get_meta("catalog_version", 0))
+
+    def close(self):
+        self.conn.close()
+
+
+_stores = {}
+
+def get_product_store(backend=None):
+    """Return the process-wide store for a backend, opening (and migrating) it on first use."""
+    backend = backend or STORE_BACKEND
+    if backend not in _stores:
+        if backend == "journal":
+            from utils.product_journal import JournalProductStore
+            _stores[backend] = JournalProductStore(PRODUCTS_FILE, PRODUCTS_JOURNAL)
+        elif backend == "sqlite":
+            _stores[backend] = SQLiteProductStore(PRODUCTS_DB, PRODUCTS_FILE)
+        else:
+            raise ValueError(f"Unknown product store backend: {backend}")
+    return _stores[backend]
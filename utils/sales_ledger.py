@@ -0,0 +1,168 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from utils.tk_results import TkResultQueue
+
+GROUP_COMMIT_MS = 50  # how long the writer waits for more bills to share one commit
+MAX_GROUP = 64
+POLL_MS = 100
+
+LedgerResult = namedtuple("LedgerResult", ["bill_id", "stock", "error"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer TEXT NOT NULL,
+    contact TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    gst_percent REAL NOT NULL DEFAULT 0,
+    discount_percent REAL NOT NULL DEFAULT 0,
+    subtotal REAL NOT NULL,
+    total REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bill_lines (
+    bill_id INTEGER NOT NULL REFERENCES bills(id),
+    product_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    price REAL NOT NULL,
+    total REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bill_lines_bill ON bill_lines(bill_id);
+CREATE INDEX IF NOT EXISTS idx_bills_created ON bills(created_at);
+"""
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, name):
+        super().__init__(f"Not enough stock for {name}")
+        self.product_id = product_id
+
+
+def write_bill(conn, bill):
+    """Insert a bill and decrement stock; raises InsufficientStock. Run inside a transaction.
+
+    Each decrement is conditional (``stock >= quantity``), so concurrent
+    writers can never sell stock that isn't there.
+    """
+    cur = conn.execute(
+        "INSERT INTO bills (customer, contact, created_at, gst_percent, discount_percent, subtotal, total) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            bill["customer"], bill.get("contact", ""),
+            bill.get("created_at") or datetime.now().isoformat(timespec="seconds"),
+            bill.get("gst_percent", 0), bill.get("discount_percent", 0),
+            bill["subtotal"], bill["total"]
+        )
+    )
+    bill_id = cur.lastrowid
+    stock = {}
+    for product_id, name, quantity, price, total in bill["lines"]:
+        cur = conn.execute(
+            "UPDATE products SET stock = stock - ?, version = version + 1 WHERE id = ? AND stock >= ?",
+            (quantity, product_id, quantity)
+        )
+        if cur.rowcount == 0:
+            raise InsufficientStock(product_id, name)
+        conn.execute(
+            "INSERT INTO bill_lines (bill_id, product_id, name, quantity, price, total) VALUES (?, ?, ?, ?, ?, ?)",
+            (bill_id, product_id, name, quantity, price, total)
+        )
+        stock[product_id] = conn.execute("SELECT stock FROM products WHERE id = ?", (product_id,)).fetchone()[0]
+    return LedgerResult(bill_id, stock, None)
+
+
+def open_ledger_connection(db_path):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")  # a committed bill survives a power cut
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class SalesLedger:
+    """Persistent record of finalized bills, written with their stock decrements.
+
+    Lives in the same SQLite database as the products table, so a bill
+    header, its lines and the matching ``stock = stock - qty`` updates are
+    committed in one transaction: either all of it is recorded or none.
+
+    A single writer thread owns the connection. Bills that arrive within
+    GROUP_COMMIT_MS of each other share one commit (and one fsync), each
+    inside its own savepoint so one failing bill doesn't affect the rest.
+    Results are handed to ``callback(LedgerResult)`` on the Tk thread.
+    """
+
+    def __init__(self, db_path, widget):
+        self.db_path = db_path
+        self.pending = queue.Queue()
+        self.results = TkResultQueue(widget, POLL_MS)
+        self.writer = threading.Thread(target=self.run, daemon=True)
+        self.writer.start()
+
+    def record_bill(self, bill, callback=None):
+        """Queue a bill for the ledger.
+
+        ``bill`` is a dict with customer, contact, gst_percent,
+        discount_percent, subtotal, total and lines, where each line is
+        ``(product_id, name, quantity, price, total)``.
+        """
+        self.results.expect()
+        self.pending.put((bill, callback))
+
+    def close(self):
+        self.pending.put(None)
+        self.writer.join()
+
+    # ------------------ WRITER THREAD ------------------
+
+    def run(self):
+        conn = open_ledger_connection(self.db_path)
+
+        stopping = False
+        while not stopping:
+            first = self.pending.get()
+            if first is None:
+                break
+            group = [first]
+            deadline = time.monotonic() + GROUP_COMMIT_MS / 1000
+            while len(group) < MAX_GROUP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                group.append(item)
+
+            for callback, result in self.commit_group(conn, group):
+                self.results.put(callback, result)
+        conn.close()
+
+    def commit_group(self, conn, group):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for bill, callback in group:
+                conn.execute("SAVEPOINT bill")
+                try:
+                    result = write_bill(conn, bill)
+                    conn.execute("RELEASE bill")
+                except (sqlite3.Error, InsufficientStock) as e:
+                    conn.execute("ROLLBACK TO bill")
+                    conn.execute("RELEASE bill")
+                    result = LedgerResult(None, {}, str(e))
+                outcomes.append((callback, result))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            outcomes = [(callback, LedgerResult(None, {}, str(e))) for _, callback in group]
+        return outcomes
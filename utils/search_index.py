@@ -0,0 +1,92 @@
+from bisect import bisect_left, insort
+
+
+class ProductSearchIndex:
+    """Type-ahead lookups over product names and brands.
+
+    Keeps a sorted array of ``(term, name, id)`` entries, where the terms are
+    the lowercased full name, each word of the name and the brand. A prefix
+    query is a bisect to the first matching term followed by a short walk, so
+    it costs O(log N + K) for K suggestions. Exact name and SKU lookups use
+    plain dicts for O(1) access.
+    """
+
+    def __init__(self, records=()):
+        self.rebuild(records)
+
+    @staticmethod
+    def terms(record):
+        name = record.name.lower()
+        terms = {name, record.brand.lower()}
+        terms.update(name.split())
+        terms.discard("")
+        return terms
+
+    @staticmethod
+    def normalize_sku(sku):
+        return sku.strip().upper()
+
+    def rebuild(self, records):
+        self.entries = []
+        self.by_name = {}
+        self.by_sku = {}
+        for record in records:
+            self.by_name.setdefault(record.name, {})[record.id] = record
+            self.index_sku(record)
+            self.entries.extend((term, record.name, record.id) for term in self.terms(record))
+        self.entries.sort()
+
+    def index_sku(self, record):
+        sku = self.normalize_sku(record.sku)
+        if sku:
+            self.by_sku.setdefault(sku, {})[record.id] = record
+
+    def add(self, record):
+        self.by_name.setdefault(record.name, {})[record.id] = record
+        self.index_sku(record)
+        for term in self.terms(record):
+            insort(self.entries, (term, record.name, record.id))
+
+    def remove(self, record):
+        same_name = self.by_name.get(record.name)
+        if same_name is not None:
+            same_name.pop(record.id, None)
+            if not same_name:
+                del self.by_name[record.name]
+        sku = self.normalize_sku(record.sku)
+        same_sku = self.by_sku.get(sku)
+        if same_sku is not None:
+            same_sku.pop(record.id, None)
+            if not same_sku:
+                del self.by_sku[sku]
+        for term in self.terms(record):
+            entry = (term, record.name, record.id)
+            pos = bisect_left(self.entries, entry)
+            if pos < len(self.entries) and self.entries[pos] == entry:
+                del self.entries[pos]
+
+    def get(self, name):
+        """Return the first product with exactly this name, or None."""
+        same_name = self.by_name.get(name)
+        return next(iter(same_name.values())) if same_name else None
+
+    def get_by_sku(self, sku):
+        """Return the first product with this SKU (case-insensitive), or None."""
+        same_sku = self.by_sku.get(self.normalize_sku(sku))
+        return next(iter(same_sku.values())) if same_sku else None
+
+    def suggest(self, prefix, limit=10):
+        """Return up to ``limit`` distinct product names with a term starting with prefix."""
+        prefix = prefix.strip().lower()
+        names = []
+        seen = set()
+        pos = bisect_left(self.entries, (prefix,))
+        while pos < len(self.entries) and len(names) < limit:
+            term, name, _ = self.entries[pos]
+            if not term.startswith(prefix):
+                break
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+            pos += 1
+        return names
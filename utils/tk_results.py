@@ -0,0 +1,45 @@
+import queue
+
+
+class TkResultQueue:
+    """Hands results from worker threads or processes to callbacks on the Tk thread.
+
+    Tk is not thread-safe, so workers never call back directly: they ``put``
+    ``(callback, result)`` on a queue that the Tk event loop drains every
+    ``poll_ms`` via ``widget.after``. Polling only runs while results are
+    still expected, so an idle app schedules nothing.
+    """
+
+    def __init__(self, widget, poll_ms):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.finished = queue.Queue()
+        self.pending = 0
+        self.poll_job = None
+
+    def expect(self):
+        """Count one result that a worker will ``put`` later; call on the Tk thread."""
+        self.pending += 1
+        if self.poll_job is None:
+            self.poll_job = self.widget.after(self.poll_ms, self.poll)
+
+    def put(self, callback, result):
+        """Safe from any thread; ``callback(result)`` runs on the Tk thread (None to skip)."""
+        self.finished.put((callback, result))
+
+    def track(self, future, callback):
+        """Expect a future's completion and pass the future itself to ``callback``."""
+        self.expect()
+        future.add_done_callback(lambda f: self.put(callback, f))
+        return future
+
+    def poll(self):
+        while True:
+            try:
+                callback, result = self.finished.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if callback:
+                callback(result)
+        self.poll_job = self.widget.after(self.poll_ms, self.poll) if self.pending else None
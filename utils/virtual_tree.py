@@ -0,0 +1,187 @@
+from tkinter import ttk
+
+
+class VirtualTreeview(ttk.Frame):
+    """A ttk.Treeview plus scrollbar that only materializes the rows in view.
+
+    The full data lives in a plain Python list (``rows``); the Treeview only
+    ever holds the visible window plus ``buffer`` extra rows, so showing
+    100k products costs the same as showing 20. The scrollbar, mouse wheel
+    and arrow/page keys move the window over the list.
+
+    Rows in the tree get ``iid = str(row_key(index, row))`` so callers can
+    keep using ``tree.focus()`` and ``tree.item(iid)["values"]`` exactly as
+    with a plain Treeview. Use ``.tree`` for headings, columns and bindings.
+
+    With a stable ``row_key`` (e.g. the product id) single-row changes can be
+    applied with ``insert_row``/``update_row``/``remove_row``. These edit the
+    backing list in place and touch at most the rows in view.
+    """
+
+    def __init__(self, master, columns, row_values, row_key=None, height=12, buffer=2, **tree_options):
+        super().__init__(master)
+        self.rows = []
+        self.first = 0
+        self.visible = height
+        self.buffer = buffer
+        self.row_values = row_values
+        self.row_key = row_key or (lambda index, row: index)
+        self.window = {}  # iid -> index into rows, for the rows currently materialized
+        self.positions = {}  # iid -> index into rows, for every row
+        self.selected = None
+
+        self.tree = ttk.Treeview(self, columns=columns, height=height, **tree_options)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_wheel)
+        self.tree.bind("<Up>", lambda e: self.move_focus(-1))
+        self.tree.bind("<Down>", lambda e: self.move_focus(1))
+        self.tree.bind("<Prior>", lambda e: self.move_focus(-self.visible))
+        self.tree.bind("<Next>", lambda e: self.move_focus(self.visible))
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select, add="+")
+
+    # ------------------ DATA ------------------
+
+    def set_rows(self, rows, reset=False):
+        """Show a new backing list. Keeps the scroll position unless reset is True."""
+        self.rows = rows
+        self.positions = {str(self.row_key(i, row)): i for i, row in enumerate(rows)}
+        if reset:
+            self.first = 0
+            self.selected = None
+        self.render()
+
+    def index_of_key(self, key):
+        return self.positions.get(str(key))
+
+    def reindex_from(self, start):
+        for index in range(start, len(self.rows)):
+            self.positions[str(self.row_key(index, self.rows[index]))] = index
+
+    def insert_row(self, row, index=None):
+        """Insert one row into the backing list (appended by default)."""
+        index = len(self.rows) if index is None else index
+        self.rows.insert(index, row)
+        self.reindex_from(index)
+        if index < self.first:
+            self.first += 1  # keep the same rows in view
+        self.patch_window(index)
+
+    def update_row(self, row):
+        """Replace the row that has the same key as ``row``."""
+        iid = str(self.row_key(None, row))
+        index = self.positions.get(iid)
+        if index is None:
+            return
+        self.rows[index] = row
+        if iid in self.window:
+            self.tree.item(iid, values=self.row_values(row))
+
+    def remove_row(self, key):
+        iid = str(key)
+        index = self.positions.pop(iid, None)
+        if index is None:
+            return
+        del self.rows[index]
+        self.reindex_from(index)
+        if iid == self.selected:
+            self.selected = None
+        if index < self.first:
+            self.first -= 1
+        self.patch_window(index)
+
+    def patch_window(self, index):
+        """Re-render only if the changed position falls inside the materialized window."""
+        if index < self.first + self.visible + self.buffer:
+            self.render()
+        else:
+            self.update_scrollbar()
+
+    # ------------------ RENDERING ------------------
+
+    def render(self):
+        total = len(self.rows)
+        self.first = max(0, min(self.first, total - self.visible))
+        end = min(total, self.first + self.visible + self.buffer)
+
+        self.tree.delete(*self.tree.get_children())
+        self.window = {}
+        for index in range(self.first, end):
+            row = self.rows[index]
+            iid = str(self.row_key(index, row))
+            self.tree.insert("", "end", iid=iid, values=self.row_values(row))
+            self.window[iid] = index
+
+        if self.selected in self.window:
+            self.tree.selection_set(self.selected)
+            self.tree.focus(self.selected)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = len(self.rows)
+        if total <= self.visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first / total, (self.first + self.visible) / total)
+
+    def scroll_to(self, first):
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def see(self, index):
+        if index < self.first:
+            self.scroll_to(index)
+        elif index >= self.first + self.visible:
+            self.scroll_to(index - self.visible + 1)
+
+    # ------------------ EVENTS ------------------
+
+    def on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * len(self.rows)))
+        elif action == "scroll":
+            step = self.visible if args[1] == "pages" else 1
+            self.scroll_to(max(0, self.first + int(args[0]) * step))
+
+    def on_wheel(self, event):
+        if event.num == 4:
+            units = -3
+        elif event.num == 5:
+            units = 3
+        else:
+            units = -3 if event.delta > 0 else 3
+        self.scroll_to(max(0, self.first + units))
+        return "break"
+
+    def move_focus(self, delta):
+        if not self.rows:
+            return "break"
+        current = self.window.get(self.tree.focus())
+        index = 0 if current is None else max(0, min(len(self.rows) - 1, current + delta))
+        self.see(index)
+        iid = str(self.row_key(index, self.rows[index]))
+        self.tree.selection_set(iid)
+        self.tree.focus(iid)
+        return "break"
+
+    def on_resize(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, event.height // rowheight - 1)  # minus the heading row
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def on_select(self, event):
+        # Rows scrolled out of the window leave the tree's selection, but stay selected here
+        selection = self.tree.selection()
+        if selection:
+            self.selected = selection[0]
+
+    def clear_selection(self):
+        self.selected = None
+        self.tree.selection_remove(*self.tree.selection())